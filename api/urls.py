@@ -14,14 +14,16 @@ from dashboard.views import DashboardStatsView, MonthlyUserTrendView
 
 # Subscription
 from subscription.views import (
-    SubscriptionPlanViewSet, UserSubscriptionViewSet, SubscribedUsersView, UnifiedStripeWebhookView
+    SubscriptionPlanViewSet, UserSubscriptionViewSet, SubscribedUsersView, UnifiedStripeWebhookView,
+    SubscriptionExportView
 )
 
 # Donation
 from donation.views import (
     DonationViewSet, DonationCampaignViewSet, CreateDonationCheckoutSessionView,
     UserDonationSummaryView, AdminDonationSummaryView, PublicDonationSummaryView,
-    YearlyDonationGraphView, MonthlyDonationGraphView, FundCollectionView, RateDonationView
+    YearlyDonationGraphView, MonthlyDonationGraphView, FundCollectionView, RateDonationView, BulkRateDonationView,
+    DonationGraphView, DonationExportView, StripeMetricsView, DonationLeaderboardView
 )
 
 # Terms
@@ -73,6 +75,7 @@ urlpatterns = [
 
     # --- Subscriptions ---
     path('subscriptions/subscribed-users/', SubscribedUsersView.as_view(), name='subscribed-users'),
+    path('subscriptions/export/<str:export_format>/', SubscriptionExportView.as_view(), name='subscription-export'),
     # path('subscriptions/create-checkout-session/', CreateSubscriptionCheckoutSessionView.as_view(), name='create-subscription-session'),
     # POST /plans/{plan_id}/create_checkout_session/
     # path('subscriptions/webhook/stripe/', subscription_stripe_webhook, name='subscription-stripe-webhook'),
@@ -82,6 +85,9 @@ urlpatterns = [
     path('donations/summary/', UserDonationSummaryView.as_view(), name='user-donation-summary'),
     path('donations/admin-summary/', AdminDonationSummaryView.as_view(), name='admin-donation-summary'),
     path('donations/public-summary/', PublicDonationSummaryView.as_view(), name='public-donation-summary'),
+    path('donations/leaderboard/', DonationLeaderboardView.as_view(), name='donation-leaderboard'),
+    path('donations/export/<str:export_format>/', DonationExportView.as_view(), name='donation-export'),
+    path('donations/stripe-metrics/', StripeMetricsView.as_view(), name='stripe-metrics'),
     # path('donations/webhook/stripe/', StripeWebhookView.as_view(), name='donation-stripe-webhook'),
 
     # --- Terms ---
@@ -94,6 +100,7 @@ urlpatterns = [
     # --- Donation Graphs & Fund Collection ---
     path('donations/graph/monthly/', MonthlyDonationGraphView.as_view(), name='monthly-donation-graph'),
     path('donations/graph/yearly/', YearlyDonationGraphView.as_view(), name='yearly-donation-graph'),
+    path('donations/graph/', DonationGraphView.as_view(), name='donation-graph'),
     path('donations/fund-collection/', FundCollectionView.as_view(), name='fund-collection'),
 
     # --- Chat test endpoint ---
@@ -101,6 +108,7 @@ urlpatterns = [
 
     # --- Donation Rating ---
     path('donations/rate/', RateDonationView.as_view(), name='rate-donation'),
+    path('donations/rate/bulk/', BulkRateDonationView.as_view(), name='bulk-rate-donation'),
 
     # --- Unified Stripe Webhook ---
     path('webhooks/stripe/', UnifiedStripeWebhookView.as_view(), name='stripe-webhook'),
@@ -1,6 +1,8 @@
 from django.contrib import admin
 
 # Register your models here.
-from chat.models import Conversation, Message
+from chat.models import Conversation, Message, UsageRecord, DailyUsage
 admin.site.register(Conversation)  
-admin.site.register(Message)  
\ No newline at end of file
+admin.site.register(Message)
+admin.site.register(UsageRecord)
+admin.site.register(DailyUsage)
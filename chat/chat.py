@@ -5,6 +5,8 @@ import openai
 import pickle
 import time
 import random
+import re
+import zlib
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -28,20 +30,126 @@ def chunk_text(text, chunk_size=1000, overlap=200):
         start += chunk_size - overlap
     return chunks
 
+# ----- USAGE ACCOUNTING -----
+# Optional callable(kind, model, prompt_tokens, completion_tokens, latency_seconds, cache_hit)
+# invoked after every model call; the Django app points it at the usage ledger.
+usage_hook = None
+
+def report_usage(kind, model, prompt_tokens, completion_tokens, latency, cache_hit=False):
+    if usage_hook is not None:
+        usage_hook(kind, model, prompt_tokens, completion_tokens, latency, cache_hit)
+
 # ----- EMBEDDINGS -----
+# "openai" embeds queries remotely, "local" uses the in-process hashed embedder only,
+# "hybrid" shortlists with the local index and re-ranks the shortlist with OpenAI.
+EMBEDDING_BACKEND = os.getenv("CHAT_EMBEDDING_BACKEND", "openai")
+
+# Cosine scores are not comparable across encoders, so each one gets its own cut-off.
+SEARCH_THRESHOLDS = {"openai": 0.7, "local": 0.1}
+
 def create_embeddings_batch(text_list, model="text-embedding-ada-002"):
+    start = time.perf_counter()
     response = openai.Embedding.create(model=model, input=text_list)
+    report_usage("embedding", model, response["usage"]["prompt_tokens"], 0, time.perf_counter() - start)
     return [item["embedding"] for item in response["data"]]
 
 def cosine_similarity(vec1, vec2):
     v1, v2 = np.array(vec1), np.array(vec2)
     return np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
 
+# ----- LOCAL EMBEDDINGS -----
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+class HashedEmbedder:
+    """
+    Offline TF-IDF encoder over hashed word uni/bi-grams and character trigrams.
+    Fit once on the corpus (only the IDF weights are learned); embedding a query
+    afterwards is pure Python/numpy and needs no network call.
+    """
+
+    def __init__(self, dim=2048):
+        self.dim = dim
+        self.idf = np.ones(dim, dtype=np.float32)
+
+    def _features(self, text):
+        words = _TOKEN_RE.findall(text.lower())
+        features = list(words)
+        features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"<{word}>"
+            features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+        return features
+
+    def _counts(self, text):
+        # crc32 is stable across processes, unlike hash(), so pickled indexes stay valid
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            vec[zlib.crc32(feature.encode()) % self.dim] += 1.0
+        return vec
+
+    def fit(self, corpus):
+        doc_freq = np.zeros(self.dim, dtype=np.float32)
+        for text in corpus:
+            doc_freq += self._counts(text) > 0
+        self.idf = np.log((1 + len(corpus)) / (1 + doc_freq)) + 1
+        return self
+
+    def embed(self, text):
+        counts = self._counts(text)
+        vec = np.log1p(counts) * self.idf
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def embed_batch(self, text_list):
+        return [self.embed(text).tolist() for text in text_list]
+
+local_embedder = HashedEmbedder()
+
+def create_local_embeddings_batch(text_list, fit=False):
+    """Same return shape as create_embeddings_batch, so both indexes pickle the same way."""
+    if fit:
+        local_embedder.fit(text_list)
+    return local_embedder.embed_batch(text_list)
+
 # ----- SEMANTIC SEARCH -----
-def semantic_search(query, text_chunks, embeddings, k=5, threshold=0.7):
-    query_emb = create_embeddings_batch([query])[0]
-    scores = [(idx, cosine_similarity(query_emb, emb)) for idx, emb in enumerate(embeddings)]
-    top_k = sorted(scores, key=lambda x: x[1], reverse=True)[:k]
+def embed_query(query, backend=None):
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "local":
+        start = time.perf_counter()
+        query_emb = local_embedder.embed(query)
+        report_usage("embedding", "local-hashed", 0, 0, time.perf_counter() - start)
+        return query_emb
+    return create_embeddings_batch([query])[0]
+
+def rank_chunks(query_emb, embeddings, k=5, candidates=None):
+    candidates = range(len(embeddings)) if candidates is None else candidates
+    scores = [(idx, cosine_similarity(query_emb, embeddings[idx])) for idx in candidates]
+    return sorted(scores, key=lambda x: x[1], reverse=True)[:k]
+
+def shortlist_chunks(query, embeddings, query_emb, size=20, backend=None, local_embeddings=None):
+    """Indices of the `size` best chunks; hybrid mode shortlists with the local encoder."""
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "hybrid":
+        return [idx for idx, _ in rank_chunks(embed_query(query, "local"), local_embeddings, k=size)]
+    return [idx for idx, _ in rank_chunks(query_emb, embeddings, k=size)]
+
+def semantic_search(query, text_chunks, embeddings, k=5, threshold=None, backend=None, local_embeddings=None, shortlist=20, query_emb=None, candidates=None):
+    """
+    `embeddings` must come from the encoder named by `backend`. In hybrid mode
+    `embeddings` are the OpenAI vectors and `local_embeddings` the hashed ones.
+    Pass `query_emb` when the query was already embedded (e.g. concurrently with other work)
+    and `candidates` to rank only those chunk indices instead of the whole corpus.
+    """
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "hybrid":
+        if candidates is None:
+            candidates = shortlist_chunks(query, embeddings, None, shortlist, backend, local_embeddings)
+        backend = "openai"
+    if threshold is None:
+        threshold = SEARCH_THRESHOLDS[backend]
+    if query_emb is None:
+        query_emb = embed_query(query, backend)
+    top_k = rank_chunks(query_emb, embeddings, k=k, candidates=candidates)
     return [text_chunks[idx] for idx, score in top_k if score >= threshold]
 
 # ----- KNOWLEDGE BASE -----
@@ -58,9 +166,10 @@ def search_knowledge_base(query):
     return "I'm not sure I have the answer, but I can help you explore it."
 
 # ----- MAIN RESPONSE -----
-def generate_response(user_message, text_chunks, embeddings, prev_queries, mode="coach", name=""):
+def generate_response(user_message, text_chunks, embeddings, prev_queries, mode="coach", name="", local_embeddings=None, pdf_results=None):
     user_msg = user_message.strip().lower()
-    pdf_results = semantic_search(user_message, text_chunks, embeddings, k=3, threshold=0.7)
+    if pdf_results is None:
+        pdf_results = semantic_search(user_message, text_chunks, embeddings, k=3, local_embeddings=local_embeddings)
     today = datetime.now().strftime("%B %d, %Y")
     # Use last 10 exchanges, both user and AI
     history = "\n".join(prev_queries[-10:])
@@ -121,14 +230,22 @@ def generate_response(user_message, text_chunks, embeddings, prev_queries, mode=
         f"DON'T provide more than one quote in one response"
         f"Now, the user says: \"{user_message}\".\n"
     )
-    response = openai.ChatCompletion.create(
-        model="gpt-4-turbo",
+    model = "gpt-4-turbo"
+    start = time.perf_counter()
+    completion = openai.ChatCompletion.create(
+        model=model,
         messages=[
             {"role": "system", "content": system_content},
             {"role": "user", "content": prompt}
         ],
         temperature=0.7
-    ).choices[0].message.content.strip()
+    )
+    usage = completion.get("usage", {})
+    report_usage(
+        "completion", model, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0),
+        time.perf_counter() - start,
+    )
+    response = completion.choices[0].message.content.strip()
     return response
 
 # ----- MAIN DRIVER -----
@@ -0,0 +1,77 @@
+import random
+import re
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from chat.chat import (
+    chunk_text,
+    create_embeddings_batch,
+    create_local_embeddings_batch,
+    extract_text_from_pdf,
+    local_embedder,
+    rank_chunks,
+)
+from chat.views import load_openai_embeddings, pdf_path
+
+
+class Command(BaseCommand):
+    help = "Compare recall and query latency of the local hashed embedder against OpenAI embeddings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queries", type=int, default=50, help="Number of queries sampled from the PDF.")
+        parser.add_argument("--queries-file", help="Optional file with one query per line instead of sampling.")
+        parser.add_argument("-k", type=int, default=3, help="Cut-off used for recall@k.")
+        parser.add_argument("--shortlist", type=int, default=20, help="Local shortlist size for the hybrid mode.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        k, shortlist = options["k"], options["shortlist"]
+        chunks = chunk_text(extract_text_from_pdf(pdf_path))
+        remote_index = load_openai_embeddings(chunks)
+
+        start = time.perf_counter()
+        local_index = create_local_embeddings_batch(chunks, fit=True)
+        self.stdout.write(f"Local index: {len(chunks)} chunks in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        queries = self._load_queries(chunks, options)
+        local_recall, hybrid_recall = [], []
+        local_times, remote_times = [], []
+
+        for query in queries:
+            start = time.perf_counter()
+            remote_emb = create_embeddings_batch([query])[0]
+            remote_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            local_emb = local_embedder.embed(query)
+            local_times.append(time.perf_counter() - start)
+
+            truth = {idx for idx, _ in rank_chunks(remote_emb, remote_index, k=k)}
+            local_top = {idx for idx, _ in rank_chunks(local_emb, local_index, k=k)}
+            candidates = {idx for idx, _ in rank_chunks(local_emb, local_index, k=shortlist)}
+            local_recall.append(len(truth & local_top) / len(truth))
+            hybrid_recall.append(len(truth & candidates) / len(truth))
+
+        self.stdout.write(f"Queries: {len(queries)}, k={k}")
+        self.stdout.write(f"Local recall@{k} vs OpenAI: {np.mean(local_recall):.3f}")
+        self.stdout.write(f"Local shortlist@{shortlist} recall (hybrid ceiling): {np.mean(hybrid_recall):.3f}")
+        for label, times in (("OpenAI", remote_times), ("Local", local_times)):
+            ms = np.array(times) * 1000
+            self.stdout.write(
+                f"{label} query embedding: p50={np.percentile(ms, 50):.3f} ms p95={np.percentile(ms, 95):.3f} ms"
+            )
+
+    def _load_queries(self, chunks, options):
+        if options["queries_file"]:
+            with open(options["queries_file"]) as f:
+                return [line.strip() for line in f if line.strip()]
+        # Use a single sentence from random chunks so each query has a known home
+        rng = random.Random(options["seed"])
+        queries = []
+        for chunk in rng.sample(chunks, min(options["queries"], len(chunks))):
+            sentences = [s.strip() for s in re.split(r"[.!?\n]", chunk) if len(s.split()) >= 5]
+            if sentences:
+                queries.append(rng.choice(sentences))
+        return queries
@@ -14,4 +14,39 @@ class Message(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    
\ No newline at end of file
+
+
+class UsageRecord(models.Model):
+    """
+    One row per model call (completion, embedding) or retrieval made for a chat turn.
+    Written in batches by chat.usage, never from the request thread.
+    """
+    KINDS = (('completion', 'Completion'), ('embedding', 'Embedding'), ('retrieval', 'Retrieval'))
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="usage_records")
+    conversation = models.ForeignKey(Conversation, on_delete=models.SET_NULL, null=True, blank=True, related_name="usage_records")
+    kind = models.CharField(max_length=10, choices=KINDS)
+    model = models.CharField(max_length=50)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    latency_ms = models.PositiveIntegerField(default=0)
+    cache_hit = models.BooleanField(default=False)
+    created_at = models.DateTimeField(db_index=True)
+
+
+class DailyUsage(models.Model):
+    """
+    Per-user daily totals of UsageRecord, incremented as each batch is flushed.
+    `requests` counts chat turns (completion rows), not every ledger row.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="daily_usage")
+    date = models.DateField()
+    requests = models.PositiveIntegerField(default=0)
+    prompt_tokens = models.PositiveBigIntegerField(default=0)
+    completion_tokens = models.PositiveBigIntegerField(default=0)
+    latency_ms = models.PositiveBigIntegerField(default=0)
+    cache_hits = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'date')
+        ordering = ['-date']
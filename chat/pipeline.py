@@ -0,0 +1,84 @@
+import contextvars
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+# Shared by every chat turn in this process; the jobs are network/DB bound so threads are enough.
+executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("CHAT_PIPELINE_WORKERS", 8)),
+    thread_name_prefix="chat-turn",
+)
+
+
+class StageTimer:
+    """
+    Records how long each stage of a chat turn takes, including stages that run
+    on the executor. `serial_ms - total_ms` is the time saved by running them concurrently.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = (time.perf_counter() - start) * 1000
+
+    def submit(self, name, fn, *args, **kwargs):
+        """Run `fn` on the shared executor, timed as stage `name`."""
+        def timed():
+            try:
+                with self.stage(name):
+                    return fn(*args, **kwargs)
+            finally:
+                close_old_connections()
+        # Carry context variables (e.g. usage attribution) into the worker thread
+        return executor.submit(contextvars.copy_context().run, timed)
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    @property
+    def serial_ms(self):
+        return sum(self.stages.values())
+
+    def server_timing(self):
+        """Value for the Server-Timing response header."""
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.stages.items()]
+        parts.append(f"total;dur={self.total_ms:.1f}")
+        return ", ".join(parts)
+
+    def log(self, label):
+        total = self.total_ms
+        logger.info(
+            "%s: total=%.1fms serial=%.1fms saved=%.1fms stages=%s",
+            label, total, self.serial_ms, self.serial_ms - total,
+            {name: round(ms, 1) for name, ms in self.stages.items()},
+        )
+
+
+def run_after_response(fn, *args, **kwargs):
+    """
+    Fire-and-forget work that may be lost without harm, such as usage or metrics writes.
+    Nothing a later request reads may go through here: the job can still be queued
+    when that request arrives, and it is dropped if the process dies first.
+    """
+    def job():
+        try:
+            fn(*args, **kwargs)
+        except Exception:
+            logger.exception("Background chat write failed")
+        finally:
+            close_old_connections()
+    return executor.submit(job)
@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .chat import EMBEDDING_BACKEND, cosine_similarity, report_usage, semantic_search, shortlist_chunks
+
+CANDIDATE_POOL = 20
+
+
+def _cache_key(conversation_id):
+    return f"chat:retrieval:{conversation_id}"
+
+
+def contextual_search(conversation_id, query, query_emb, chunks, embeddings, local_embeddings=None, k=3):
+    """
+    Semantic search that remembers the candidate pool of the previous turn.
+
+    Each conversation caches the query embedding that produced its last full scan
+    plus the CANDIDATE_POOL best chunks for it. While follow-up queries stay close
+    to that anchor only the pool is re-ranked; a topic change triggers a fresh scan.
+    Every hit re-arms the TTL, so the entry lives until the conversation goes idle.
+    """
+    start = time.perf_counter()
+    key = _cache_key(conversation_id)
+    context = cache.get(key)
+    hit = bool(context) and cosine_similarity(query_emb, context["anchor_emb"]) >= settings.CHAT_RETRIEVAL_REUSE_SIMILARITY
+    if hit:
+        candidates = context["candidates"]
+    else:
+        candidates = shortlist_chunks(query, embeddings, query_emb, CANDIDATE_POOL, local_embeddings=local_embeddings)
+        context = {"anchor_emb": list(query_emb), "candidates": candidates}
+
+    cache.set(key, context, timeout=settings.CHAT_RETRIEVAL_CACHE_TTL)
+    results = semantic_search(
+        query, chunks, embeddings, k=k, local_embeddings=local_embeddings,
+        query_emb=query_emb, candidates=candidates,
+    )
+    report_usage("retrieval", EMBEDDING_BACKEND, 0, 0, time.perf_counter() - start, cache_hit=hit)
+    return results
+
+
+def forget_conversation(conversation_id):
+    cache.delete(_cache_key(conversation_id))
@@ -1,3 +1,297 @@
-from django.test import TestCase
+import contextvars
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from subscription.models import SubscriptionPlan, UserSubscription
+from users.models import User
+from .chat import HashedEmbedder, create_local_embeddings_batch, semantic_search
+from .models import Conversation, DailyUsage, Message, UsageRecord
+from .pipeline import StageTimer
+from .retrieval import contextual_search, forget_conversation
+from .throttles import ChatMessageThrottle, get_chat_limits
+from .usage import UsageBuffer, write_batch
+
+CHUNKS = [
+    "Deep breathing slows a racing heart when anxiety rises.",
+    "Procrastination fades once you start with five small minutes of work.",
+    "A daily gratitude journal helps you notice what went well.",
+    "Sleep comes easier when screens are put away an hour before bed.",
+]
+
+
+class HashedEmbedderTests(SimpleTestCase):
+
+    def setUp(self):
+        self.embedder = HashedEmbedder(dim=512).fit(CHUNKS)
+
+    def test_embeddings_are_unit_length_and_deterministic(self):
+        vec = self.embedder.embed("breathing for anxiety")
+
+        self.assertEqual(vec.shape, (512,))
+        self.assertAlmostEqual(float(np.linalg.norm(vec)), 1.0, places=5)
+        np.testing.assert_array_equal(vec, HashedEmbedder(dim=512).fit(CHUNKS).embed("breathing for anxiety"))
+
+    def test_empty_text_embeds_to_zero_vector(self):
+        self.assertFalse(self.embedder.embed("").any())
+
+    def test_related_text_scores_higher_than_unrelated(self):
+        query = self.embedder.embed("how do I stop procrastinating on work")
+        scores = [float(query @ self.embedder.embed(chunk)) for chunk in CHUNKS]
+
+        self.assertEqual(int(np.argmax(scores)), 1)
+
+
+class SemanticSearchTests(SimpleTestCase):
+
+    def setUp(self):
+        self.local = create_local_embeddings_batch(CHUNKS, fit=True)
+        # Query embeddings report usage; keep these rows out of the ledger
+        patcher = mock.patch('chat.chat.usage_hook', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_local_backend_returns_best_chunk_above_threshold(self):
+        results = semantic_search("trouble sleeping at night, bed screens", CHUNKS, self.local, k=1, backend="local")
+
+        self.assertEqual(results, [CHUNKS[3]])
+
+    def test_threshold_drops_weak_matches(self):
+        results = semantic_search("breathing anxiety", CHUNKS, self.local, k=4, backend="local", threshold=0.99)
+
+        self.assertEqual(results, [])
+
+    def test_hybrid_reranks_only_the_local_shortlist(self):
+        # Remote vectors prefer chunk 2, but the local shortlist of one only contains chunk 0
+        remote = [[1.0, 0.0], [0.0, 1.0], [0.9, 0.1], [0.0, 1.0]]
+        results = semantic_search(
+            "deep breathing anxiety", CHUNKS, remote, k=1, backend="hybrid",
+            local_embeddings=self.local, shortlist=1, query_emb=[0.9, 0.1],
+        )
+
+        self.assertEqual(results, [CHUNKS[0]])
+
+
+class StageTimerTests(SimpleTestCase):
+
+    def test_records_inline_and_executor_stages(self):
+        label = contextvars.ContextVar('label')
+        label.set('turn-1')
+        timer = StageTimer()
+
+        with timer.stage('history'):
+            pass
+        future = timer.submit('embed', lambda: label.get())
+
+        self.assertEqual(future.result(), 'turn-1')
+        self.assertEqual(set(timer.stages), {'history', 'embed'})
+        self.assertGreaterEqual(timer.serial_ms, timer.stages['embed'])
+        header = timer.server_timing()
+        self.assertTrue(header.startswith('history;dur='))
+        self.assertIn('embed;dur=', header)
+        self.assertIn('total;dur=', header)
+
+
+class SendMessageTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='chat@example.com', password='x')
+        self.conversation = Conversation.objects.create(user=self.user, mode='coach')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @mock.patch('chat.views.generate_response', return_value='Try a short walk.')
+    @mock.patch('chat.views.contextual_search', return_value=[])
+    @mock.patch('chat.views.embed_query', return_value=[1.0])
+    @mock.patch('chat.views.load_index', return_value=(['chunk'], [[1.0]], None))
+    def test_reply_is_stored_before_the_response_returns(self, *mocks):
+        response = self.client.post(
+            reverse('conversation-send-message', args=[self.conversation.id]), {'content': 'I feel stuck'}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ai_message;dur=', response['Server-Timing'])
+        self.assertEqual(
+            list(Message.objects.filter(conversation=self.conversation).order_by('id').values_list('role', 'content')),
+            [('user', 'I feel stuck'), ('ai', 'Try a short walk.')],
+        )
+        history = self.client.get(reverse('conversation-messages', args=[self.conversation.id])).json()
+        self.assertEqual([m['role'] for m in history], ['user', 'ai'])
+
+
+@override_settings(CHAT_RETRIEVAL_REUSE_SIMILARITY=0.9, CHAT_RETRIEVAL_CACHE_TTL=60)
+class RetrievalCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.hits = []
+        patches = [
+            mock.patch('chat.retrieval.shortlist_chunks', return_value=[2, 0, 1]),
+            mock.patch('chat.retrieval.semantic_search', return_value=['chunk']),
+            mock.patch('chat.retrieval.report_usage', side_effect=lambda *a, cache_hit: self.hits.append(cache_hit)),
+        ]
+        self.shortlist, self.search, _ = [patcher.start() for patcher in patches]
+        for patcher in patches:
+            self.addCleanup(patcher.stop)
+
+    def search_for(self, query_emb, conversation_id=1):
+        return contextual_search(conversation_id, 'query', query_emb, CHUNKS, [[1.0, 0.0]] * len(CHUNKS))
+
+    def test_close_follow_up_reuses_the_candidate_pool(self):
+        self.search_for([1.0, 0.0])
+        self.search_for([0.99, 0.05])
+
+        self.assertEqual(self.hits, [False, True])
+        self.shortlist.assert_called_once()
+        self.assertEqual(self.search.call_args.kwargs['candidates'], [2, 0, 1])
+
+    def test_topic_change_rescans(self):
+        self.search_for([1.0, 0.0])
+        self.search_for([0.0, 1.0])
+
+        self.assertEqual(self.hits, [False, False])
+        self.assertEqual(self.shortlist.call_count, 2)
+
+    def test_conversations_do_not_share_pools_and_can_be_forgotten(self):
+        self.search_for([1.0, 0.0], conversation_id=1)
+        self.search_for([1.0, 0.0], conversation_id=2)
+        forget_conversation(1)
+        self.search_for([1.0, 0.0], conversation_id=1)
+        self.search_for([1.0, 0.0], conversation_id=2)
+
+        self.assertEqual(self.hits, [False, False, False, True])
+
+    @override_settings(CHAT_RETRIEVAL_CACHE_TTL=1)
+    def test_idle_pool_expires(self):
+        with mock.patch('time.time', return_value=1000.0):
+            self.search_for([1.0, 0.0])
+        with mock.patch('time.time', return_value=1002.0):
+            self.search_for([1.0, 0.0])
+
+        self.assertEqual(self.hits, [False, False])
+
+
+class UsageLedgerTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='usage@example.com', password='x')
+
+    def record(self, kind, prompt_tokens=0, completion_tokens=0, cache_hit=False):
+        return UsageRecord(
+            user=self.user, kind=kind, model='m', prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens, latency_ms=10, cache_hit=cache_hit, created_at=timezone.now(),
+        )
+
+    def turn(self):
+        return [
+            self.record('embedding', prompt_tokens=5),
+            self.record('retrieval', cache_hit=True),
+            self.record('completion', prompt_tokens=100, completion_tokens=40),
+        ]
+
+    def test_batches_fold_into_one_daily_row_counting_turns(self):
+        write_batch(self.turn())
+        write_batch(self.turn())
+
+        daily = DailyUsage.objects.get(user=self.user)
+        self.assertEqual(UsageRecord.objects.count(), 6)
+        self.assertEqual(daily.requests, 2)
+        self.assertEqual(daily.prompt_tokens, 210)
+        self.assertEqual(daily.completion_tokens, 80)
+        self.assertEqual(daily.cache_hits, 2)
+        self.assertEqual(daily.latency_ms, 60)
+
+    def test_full_buffer_hands_its_batch_over(self):
+        buffer = UsageBuffer(max_size=3, max_age=60)
+        with mock.patch('chat.usage.run_after_response') as run:
+            for record in self.turn():
+                buffer.add(record)
+
+        run.assert_called_once_with(write_batch, mock.ANY)
+        self.assertEqual(len(run.call_args.args[1]), 3)
+        self.assertIsNone(buffer._timer)
+
+    def test_quiet_buffer_is_flushed_by_its_timer(self):
+        buffer = UsageBuffer(max_size=100, max_age=0.05)
+        flushed = threading.Event()
+        with mock.patch('chat.usage.run_after_response', side_effect=lambda fn, batch: flushed.set()) as run:
+            buffer.add(self.record('completion'))
+            self.assertTrue(flushed.wait(2))
+
+        self.assertEqual(len(run.call_args.args[1]), 1)
+        self.assertEqual(buffer._pending, [])
+
+
+@override_settings(CHAT_FREE_MESSAGES_PER_HOUR=3600, CHAT_FREE_BURST=2)
+class ChatMessageThrottleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='throttle@example.com', password='x')
+        self.request = mock.Mock(user=self.user)
+        self.now = 1_000_000.0
+        patcher = mock.patch('chat.throttles.time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def allow(self):
+        throttle = ChatMessageThrottle()
+        return throttle.allow_request(self.request, None), throttle.wait()
+
+    def test_burst_then_deny_with_wait(self):
+        self.assertEqual([self.allow()[0] for _ in range(3)], [True, True, False])
+        self.assertAlmostEqual(self.allow()[1], 1.0)
+
+    def test_tokens_refill_at_the_hourly_rate(self):
+        for _ in range(2):
+            self.allow()
+        self.now += 1.5
+
+        self.assertEqual([self.allow()[0] for _ in range(2)], [True, False])
+
+    @override_settings(CHAT_FREE_MESSAGES_PER_HOUR=0)
+    def test_zero_limit_disables_chat(self):
+        self.assertEqual(self.allow(), (False, None))
+
+    def test_subscribers_get_their_plan_limits(self):
+        plan = SubscriptionPlan.objects.create(
+            name='Plus', price='5.00', duration_days=30, chat_messages_per_hour=60, chat_burst=4,
+        )
+        UserSubscription.objects.create(user=self.user, plan=plan, payment_status='completed')
+
+        self.assertEqual(get_chat_limits(self.user), (f'plan{plan.id}', 60, 4))
+        self.assertEqual([self.allow()[0] for _ in range(5)], [True] * 4 + [False])
+
+    def test_parallel_requests_cannot_overspend(self):
+        get_chat_limits(self.user)  # warm the limits cache so the threads stay off the database
+        start = threading.Barrier(8)
+        results = []
+        get = LocMemCache.get
+
+        def slow_get(backend, *args, **kwargs):
+            # Widen the read-modify-write window so unsynchronised threads would interleave
+            value = get(backend, *args, **kwargs)
+            time.sleep(0.01)
+            return value
+
+        def send():
+            start.wait()
+            results.append(self.allow()[0])
+
+        threads = [threading.Thread(target=send) for _ in range(8)]
+        with mock.patch.object(LocMemCache, 'get', slow_get):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(results.count(True), 2)
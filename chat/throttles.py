@@ -0,0 +1,102 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.throttling import BaseThrottle
+
+from subscription.models import UserSubscription
+
+LIMITS_TTL = 60
+
+# The bucket lock is held for a cache round trip; it expires on its own if a worker dies holding it
+LOCK_SECONDS = 5
+LOCK_WAIT_SECONDS = 1
+
+
+def _limits_key(user_id):
+    return f"chat:limits:{user_id}"
+
+
+def forget_chat_limits(user_id):
+    cache.delete(_limits_key(user_id))
+
+
+def get_chat_limits(user):
+    """
+    (plan_key, messages_per_hour, burst) for the user's current plan, or the free
+    tier limits from settings. Cached briefly so the throttle stays off the DB.
+    """
+    key = _limits_key(user.id)
+    limits = cache.get(key)
+    if limits is None:
+        # Subscriptions created through the webhook are saved before start_date exists,
+        # so end_date can be empty; treat those as open-ended like the rest of the app does.
+        subscription = (
+            UserSubscription.objects.filter(user=user, is_active=True)
+            .filter(Q(end_date__isnull=True) | Q(end_date__gt=timezone.now()))
+            .select_related('plan')
+            .first()
+        )
+        if subscription:
+            plan = subscription.plan
+            limits = (f"plan{plan.id}", plan.chat_messages_per_hour, plan.chat_burst)
+        else:
+            limits = ("free", settings.CHAT_FREE_MESSAGES_PER_HOUR, settings.CHAT_FREE_BURST)
+        cache.set(key, limits, LIMITS_TTL)
+    return limits
+
+
+class ChatMessageThrottle(BaseThrottle):
+    """
+    Token bucket per (user, plan) kept in the cache backend: `burst` tokens refilled
+    at `messages_per_hour`, one spent per message. The read-modify-write runs under a
+    cache.add lock, so parallel requests from one user are serialised instead of all
+    spending the same token; a request that cannot get the lock is refused.
+    A limit of 0 means the tier has no chat at all, so every message is refused.
+    """
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        if not request.user.is_authenticated:
+            return True
+
+        plan_key, per_hour, burst = get_chat_limits(request.user)
+        if not per_hour or not burst:
+            return False
+
+        key = f"chat:bucket:{request.user.id}:{plan_key}"
+        if not _acquire(f"{key}:lock"):
+            self.wait_seconds = LOCK_WAIT_SECONDS
+            return False
+        try:
+            return self._spend(key, per_hour / 3600.0, burst)
+        finally:
+            cache.delete(f"{key}:lock")
+
+    def _spend(self, key, rate, burst):
+        now = time.time()
+        tokens, updated = cache.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        else:
+            self.wait_seconds = (1 - tokens) / rate
+        # A bucket left alone this long is full again, so the entry can simply expire
+        cache.set(key, (tokens, now), timeout=int(burst / rate) + 1)
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+def _acquire(lock_key):
+    deadline = time.monotonic() + LOCK_WAIT_SECONDS
+    while not cache.add(lock_key, 1, LOCK_SECONDS):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.005)
+    return True
@@ -0,0 +1,125 @@
+import atexit
+import contextvars
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from main.counters import increment_or_create
+
+from .models import DailyUsage, UsageRecord
+from .pipeline import executor, run_after_response
+
+logger = logging.getLogger(__name__)
+
+# Who the current chat turn belongs to; copied into executor jobs by StageTimer.submit.
+current_user_id = contextvars.ContextVar("chat_usage_user_id", default=None)
+current_conversation_id = contextvars.ContextVar("chat_usage_conversation_id", default=None)
+
+
+def bind(user_id, conversation_id):
+    """Attribute usage reported in this context to a user and conversation."""
+    current_user_id.set(user_id)
+    current_conversation_id.set(conversation_id)
+
+
+class UsageBuffer:
+    """
+    Collects UsageRecord rows in memory and hands them to the executor in batches,
+    when `max_size` rows are pending or, via a timer, `max_age` seconds after the
+    first of them arrived. A hard kill can lose at most that window of rows.
+    """
+
+    def __init__(self, max_size, max_age):
+        self.max_size = max_size
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._pending = []
+        self._timer = None
+
+    def add(self, record):
+        with self._lock:
+            self._pending.append(record)
+            if len(self._pending) == 1:
+                self._timer = threading.Timer(self.max_age, self._flush_due)
+                self._timer.daemon = True
+                self._timer.start()
+            if len(self._pending) < self.max_size:
+                return
+            batch = self._take()
+        run_after_response(write_batch, batch)
+
+    def flush(self):
+        with self._lock:
+            batch = self._take()
+        if batch:
+            write_batch(batch)
+
+    def _take(self):
+        # Caller holds the lock
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _flush_due(self):
+        with self._lock:
+            # A size flush may have taken the batch (and armed a new timer) meanwhile
+            if self._timer is not threading.current_thread():
+                return
+            batch = self._take()
+        if batch:
+            run_after_response(write_batch, batch)
+
+
+def write_batch(records):
+    """Insert a batch of ledger rows and fold them into the per-user daily rollup."""
+    totals = defaultdict(lambda: defaultdict(int))
+    for record in records:
+        if record.user_id is None:
+            continue
+        row = totals[(record.user_id, record.created_at.date())]
+        # One completion per chat turn; embeddings and retrievals are parts of the same turn
+        row["requests"] += int(record.kind == "completion")
+        row["prompt_tokens"] += record.prompt_tokens
+        row["completion_tokens"] += record.completion_tokens
+        row["latency_ms"] += record.latency_ms
+        row["cache_hits"] += int(record.cache_hit)
+
+    with transaction.atomic():
+        UsageRecord.objects.bulk_create(records)
+        for (user_id, date), row in totals.items():
+            increment_or_create(DailyUsage, {'user_id': user_id, 'date': date}, row)
+
+
+buffer = UsageBuffer(settings.CHAT_USAGE_BUFFER_SIZE, settings.CHAT_USAGE_FLUSH_SECONDS)
+
+
+def record(kind, model, prompt_tokens, completion_tokens, latency, cache_hit=False):
+    """usage_hook for chat.chat: queue one ledger row without touching the database."""
+    buffer.add(UsageRecord(
+        user_id=current_user_id.get(),
+        conversation_id=current_conversation_id.get(),
+        kind=kind,
+        model=model,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        latency_ms=round(latency * 1000),
+        cache_hit=cache_hit,
+        created_at=timezone.now(),
+    ))
+
+
+def _flush_on_exit():
+    try:
+        buffer.flush()
+    except Exception:
+        logger.exception("Could not flush chat usage ledger on shutdown")
+    executor.shutdown(wait=True)
+
+
+atexit.register(_flush_on_exit)
@@ -13,14 +13,22 @@ from .serializers import (
 )
 from .chat import (
     generate_response,
+    embed_query,
     extract_text_from_pdf,
     chunk_text,
-    create_embeddings_batch
+    create_embeddings_batch,
+    create_local_embeddings_batch,
+    EMBEDDING_BACKEND,
 )
+from .pipeline import StageTimer
+from .retrieval import contextual_search, forget_conversation
+from .throttles import ChatMessageThrottle
+from . import usage
 
 
 import os
 import pickle
+from functools import lru_cache
 
 from users.models import User
 
@@ -30,19 +38,33 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # === Full path to your PDF file ===
 pdf_path = os.path.join(BASE_DIR, "chat", "The_Apple_and_The_Stone (10) (1) (2).pdf")
 
-# Extract and chunk text
-text = extract_text_from_pdf(pdf_path)
-chunks = chunk_text(text)
-
-# === Load or generate PDF embeddings ===
 embedding_path = os.path.join(BASE_DIR, "chat", "pdf_embeddings.pkl")
-if os.path.exists(embedding_path):
-    with open(embedding_path, "rb") as f:
-        embeddings = pickle.load(f)
-else:
+
+
+def load_openai_embeddings(chunks):
+    """Load or generate the OpenAI PDF embeddings."""
+    if os.path.exists(embedding_path):
+        with open(embedding_path, "rb") as f:
+            return pickle.load(f)
     embeddings = create_embeddings_batch(chunks)
     with open(embedding_path, "wb") as f:
         pickle.dump(embeddings, f)
+    return embeddings
+
+
+@lru_cache(maxsize=None)
+def load_index():
+    """
+    Returns (chunks, embeddings, local_embeddings) for the configured backend.
+    Built on first use rather than at import so the local backend never touches the network.
+    """
+    chunks = chunk_text(extract_text_from_pdf(pdf_path))
+    local_embeddings = None
+    if EMBEDDING_BACKEND in ("local", "hybrid"):
+        local_embeddings = create_local_embeddings_batch(chunks, fit=True)
+    if EMBEDDING_BACKEND == "local":
+        return chunks, local_embeddings, local_embeddings
+    return chunks, load_openai_embeddings(chunks), local_embeddings
 
 
 class ConversationViewSet(viewsets.ModelViewSet):
@@ -58,6 +80,10 @@ class ConversationViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        forget_conversation(instance.id)
+        instance.delete()
+
     @action(
         detail=False,
         methods=['post'],
@@ -76,7 +102,7 @@ class ConversationViewSet(viewsets.ModelViewSet):
             "conversation_id": conv.id
         }, status=201)
 
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated], throttle_classes=[ChatMessageThrottle])
     def send_message(self, request, pk=None):
         conv = self.get_object()
 
@@ -87,26 +113,47 @@ class ConversationViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         user_msg = serializer.validated_data['content'].strip()
 
-        if not conv.title:
-            conv.title = f"User: {user_msg[:50]}"
-            conv.save()
-
-        Message.objects.create(conversation=conv, role='user', content=user_msg)
+        usage.bind(request.user.id, conv.id)
+        timer = StageTimer()
+        chunks, embeddings, local_embeddings = load_index()
+        # The query embedding is a network call with no DB dependency, so it runs
+        # while this thread writes the user message and loads the history.
+        embedding = timer.submit("embed", embed_query, user_msg)
 
+        with timer.stage("user_message"):
+            if not conv.title:
+                conv.title = f"User: {user_msg[:50]}"
+                conv.save(update_fields=['title'])
+            Message.objects.create(conversation=conv, role='user', content=user_msg)
 
         # Gather previous messages (user and AI) for conversation history
-        previous_msgs = list(conv.messages.order_by('created_at').values_list('role', 'content'))
+        with timer.stage("history"):
+            previous_msgs = list(conv.messages.order_by('created_at').values_list('role', 'content'))
         prev_queries = [f"{role.capitalize()}: {content}" for role, content in previous_msgs]
         # Get user's name for greeting
         name = request.user.first_name or request.user.email or "User"
-        ai_reply = generate_response(user_msg, chunks, embeddings, prev_queries, conv.mode, name=name)
 
-        Message.objects.create(conversation=conv, role='ai', content=ai_reply)
-
-        return Response({
+        query_emb = embedding.result()
+        with timer.stage("search"):
+            pdf_results = contextual_search(
+                conv.id, user_msg, query_emb, chunks, embeddings, local_embeddings=local_embeddings
+            )
+        with timer.stage("llm"):
+            ai_reply = generate_response(
+                user_msg, chunks, embeddings, prev_queries, conv.mode, name=name, pdf_results=pdf_results
+            )
+
+        # The next turn's history and the messages endpoint must see the reply, so it is saved before responding
+        with timer.stage("ai_message"):
+            Message.objects.create(conversation=conv, role='ai', content=ai_reply)
+        timer.log(f"chat turn conv={conv.id}")
+
+        response = Response({
             "User": user_msg,
             "AI": ai_reply
         }, status=200)
+        response["Server-Timing"] = timer.server_timing()
+        return response
 
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
     def messages(self, request, pk=None):
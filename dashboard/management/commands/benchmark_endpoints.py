@@ -0,0 +1,239 @@
+import json
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from chat.models import Conversation
+from dashboard.management.commands.seed_load_data import EMAIL_DOMAIN
+from donation.models import Donation, DonationCampaign
+from users.models import User
+
+# name, path, who calls it (None = anonymous). {campaign} and {conversation} are filled from the data.
+ENDPOINTS = [
+    ("donations", "/api/donations/", None),
+    ("donations_by_campaign", "/api/donations/?campaign={campaign}&payment_status=completed", None),
+    ("campaigns", "/api/campaigns/", None),
+    ("campaigns_search", "/api/campaigns/?is_active=true&search=relief", None),
+    ("donations_public_summary", "/api/donations/public-summary/", None),
+    ("donations_graph", "/api/donations/graph/", None),
+    ("donations_leaderboard", "/api/donations/leaderboard/", None),
+    ("donations_admin_summary", "/api/donations/admin-summary/", "admin"),
+    ("users_active", "/api/users/active/", "admin"),
+    ("dashboard_stats", "/api/dashboard/stats/", "admin"),
+    ("dashboard_user_trend", "/api/dashboard/user-trend/", "admin"),
+    ("conversations", "/api/conversations/", "user"),
+    ("conversation_messages", "/api/conversations/{conversation}/messages/", "user"),
+]
+
+# Served from the public stats cache: timed warm they only measure a cache hit, so they always run cold
+CACHED_ENDPOINTS = {"donations_public_summary", "donations_graph", "donations_leaderboard"}
+
+# Cold runs clear the cache between requests; a private in-process cache keeps that off a shared Redis
+BENCHMARK_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "benchmark"}}
+
+# Only the machine-independent numbers are committed; latency depends on the box and is just reported
+BUDGET_KEYS = ("queries", "peak_kb")
+
+
+def default_baseline_path():
+    return Path(apps.get_app_config("dashboard").path) / "benchmarks" / "baselines.json"
+
+
+class QueryCounter:
+    """connection.execute_wrapper hook; unlike CaptureQueriesContext it survives the reset_queries done per request."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def compare(results, baseline, threshold):
+    """List the query and memory budgets each endpoint blew relative to the baseline."""
+    regressions = []
+    for name, result in results.items():
+        budget = baseline.get(name)
+        if budget is None:
+            continue
+        if result["queries"] > budget["queries"]:
+            regressions.append(f"{name}: {result['queries']} queries (baseline {budget['queries']})")
+        if result["peak_kb"] > budget["peak_kb"] * (1 + threshold):
+            regressions.append(f"{name}: peak memory {result['peak_kb']:.0f}KB (baseline {budget['peak_kb']:.0f}KB)")
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API endpoints in-process against the current (seeded) database. Reports latency "
+        "percentiles, SQL query count and peak memory; query count and peak memory are compared with the "
+        "committed baseline. Latency is machine-specific and never stored or gated on: compare p95 between "
+        "runs on the same machine."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=30)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument("--only", default="", help="Comma-separated endpoint names")
+        parser.add_argument("--cold", action="store_true",
+                            help="Clear the cache before every request (cached public stats endpoints always are)")
+        parser.add_argument("--baseline", default=str(default_baseline_path()))
+        parser.add_argument("--threshold", type=float, default=0.25,
+                            help="Allowed relative growth of peak memory")
+        parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+        parser.add_argument("--no-fail", action="store_true", help="Report regressions without failing")
+        parser.add_argument("--allow-dataset-mismatch", action="store_true",
+                            help="Compare even if the database is not the size the baseline was recorded on")
+
+    def handle(self, *args, **options):
+        with override_settings(CACHES=BENCHMARK_CACHES):
+            self.run(options)
+
+    def run(self, options):
+        endpoints = self.resolve_endpoints(options["only"])
+        clients = self.build_clients()
+        dataset = {"users": User.objects.count(), "donations": Donation.objects.count()}
+        baseline_path = Path(options["baseline"])
+        baseline = {} if options["update_baseline"] else self.load_baseline(baseline_path)
+        if baseline:
+            self.check_dataset(baseline["meta"], dataset, options["allow_dataset_mismatch"])
+
+        results = {}
+        for name, path, who in endpoints:
+            cold = options["cold"] or name in CACHED_ENDPOINTS
+            results[name] = self.measure(clients[who], path, cold, options)
+            self.report(name, results[name])
+
+        if options["update_baseline"]:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            meta = {**dataset, "iterations": options["iterations"], "cold": options["cold"]}
+            previous = self.load_baseline(baseline_path).get("endpoints", {}) if options["only"] else {}
+            budgets = {name: {key: result[key] for key in BUDGET_KEYS} for name, result in results.items()}
+            payload = {"meta": meta, "endpoints": {**previous, **budgets}}
+            baseline_path.write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {baseline_path}"))
+            return
+
+        if not baseline:
+            self.stdout.write(self.style.WARNING(f"No baseline at {baseline_path}; run with --update-baseline"))
+            return
+        if baseline["meta"].get("cold", False) != options["cold"]:
+            self.stdout.write(self.style.WARNING("Baseline was recorded with a different --cold setting"))
+
+        regressions = compare(results, baseline["endpoints"], options["threshold"])
+        for line in regressions:
+            self.stdout.write(self.style.ERROR(f"REGRESSION {line}"))
+        if regressions and not options["no_fail"]:
+            raise CommandError(f"{len(regressions)} endpoint budget(s) exceeded")
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS("All endpoints within budget"))
+
+    def check_dataset(self, meta, dataset, allow_mismatch):
+        """Query and memory budgets only mean something against the data volume they were recorded on."""
+        recorded = {key: meta.get(key) for key in dataset}
+        if recorded == dataset:
+            return
+        message = (
+            f"Baseline was recorded with {recorded['users']} users and {recorded['donations']} donations, "
+            f"this database has {dataset['users']} and {dataset['donations']}"
+        )
+        if not allow_mismatch:
+            raise CommandError(f"{message}; reseed to match or pass --allow-dataset-mismatch")
+        self.stdout.write(self.style.WARNING(message))
+
+    def resolve_endpoints(self, only):
+        wanted = {name.strip() for name in only.split(",") if name.strip()}
+        unknown = wanted - {name for name, _, _ in ENDPOINTS}
+        if unknown:
+            raise CommandError(f"Unknown endpoint(s): {', '.join(sorted(unknown))}")
+
+        campaign = DonationCampaign.objects.order_by("-supporters").values_list("id", flat=True).first()
+        self.chat_user = (
+            Conversation.objects.values("user").annotate(n=Count("id")).order_by("-n").values_list("user", flat=True).first()
+        )
+        conversation = (
+            Conversation.objects.filter(user=self.chat_user).annotate(n=Count("messages"))
+            .order_by("-n").values_list("id", flat=True).first()
+        )
+
+        endpoints = []
+        for name, path, who in ENDPOINTS:
+            if wanted and name not in wanted:
+                continue
+            if ("{campaign}" in path and campaign is None) or (who == "user" and self.chat_user is None):
+                self.stdout.write(self.style.WARNING(f"Skipping {name}: no data to call it with"))
+                continue
+            endpoints.append((name, path.format(campaign=campaign, conversation=conversation), who))
+        return endpoints
+
+    def build_clients(self):
+        admin, _ = User.objects.get_or_create(
+            email=f"bench-admin@{EMAIL_DOMAIN}",
+            defaults={"is_staff": True, "is_superuser": True, "is_verified": True, "password": "!"},
+        )
+        clients = {None: APIClient(), "admin": APIClient()}
+        clients["admin"].force_authenticate(admin)
+        if self.chat_user is not None:
+            clients["user"] = APIClient()
+            clients["user"].force_authenticate(User.objects.get(pk=self.chat_user))
+        return clients
+
+    def call(self, client, path, cold):
+        if cold:
+            cache.clear()
+        response = client.get(path)
+        if response.status_code != 200:
+            raise CommandError(f"GET {path} returned {response.status_code}")
+        return response
+
+    def measure(self, client, path, cold, options):
+        for _ in range(options["warmup"]):
+            self.call(client, path, cold)
+
+        timings = []
+        counter = QueryCounter()
+        for _ in range(options["iterations"]):
+            counter.count = 0
+            with connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                self.call(client, path, cold)
+                timings.append((time.perf_counter() - started) * 1000)
+        queries = counter.count
+
+        # tracemalloc slows allocation down, so memory gets its own request outside the timed loop
+        tracemalloc.start()
+        try:
+            self.call(client, path, cold)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+        return {
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+            "queries": queries,
+            "peak_kb": round(peak / 1024, 1),
+        }
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"  {name:<26} p50 {result['p50_ms']:8.2f}ms  p95 {result['p95_ms']:8.2f}ms  "
+            f"p99 {result['p99_ms']:8.2f}ms  {result['queries']:4d} queries  {result['peak_kb']:9.1f}KB"
+        )
+
+    def load_baseline(self, path):
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text())
@@ -0,0 +1,303 @@
+import datetime
+import math
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from chat.models import Conversation, Message
+from dashboard.models import Earning, SiteMetric
+from donation.models import Donation, DonationCampaign
+from subscription.models import SubscriptionPlan, UserSubscription
+from users.models import User
+
+EMAIL_DOMAIN = "load.test"
+FIRST_NAMES = ["Ada", "Bola", "Chen", "Dara", "Emil", "Farah", "Goran", "Hana", "Ines", "Jon", "Kemi", "Lior"]
+LAST_NAMES = ["Ahmed", "Berg", "Costa", "Diaz", "Eze", "Fox", "Gupta", "Haas", "Ito", "Jones", "Khan", "Lund"]
+CAUSES = ["Clean water", "School meals", "Flood relief", "Medical camp", "Girls' education", "Winter clothing"]
+ORGANIZATIONS = ["Wells for All", "Bright Futures", "Relief Now", "Care Bridge", "Open Hands"]
+WORDS = (
+    "hope help today plan week goal friend family feel better think maybe talk about work stress sleep "
+    "learn start small steps progress remember try again thanks sure great idea because really"
+).split()
+PLANS = [("Load Monthly", Decimal("9.99"), 30), ("Load Quarterly", Decimal("24.99"), 90), ("Load Yearly", Decimal("89.99"), 365)]
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep the generated dates instead of auto_now/auto_now_add overwriting them."""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed realistic volumes of users, campaigns, donations, subscriptions, chat conversations "
+        f"and site metrics (accounts use @{EMAIL_DOMAIN}). Run against a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", type=float, default=1.0, help="Multiply every count below")
+        parser.add_argument("--users", type=int, default=100_000)
+        parser.add_argument("--campaigns", type=int, default=1_000)
+        parser.add_argument("--donations", type=int, default=1_000_000)
+        parser.add_argument("--subscriptions", type=int, default=30_000)
+        parser.add_argument("--conversations", type=int, default=50_000)
+        parser.add_argument("--messages", type=int, default=500_000)
+        parser.add_argument("--days", type=int, default=730, help="History length ending today")
+        parser.add_argument("--batch-size", type=int, default=5_000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--force", action="store_true", help="Allow running with DEBUG off")
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options["force"]:
+            raise CommandError("Refusing to seed load data with DEBUG off; pass --force if this really is a scratch database.")
+
+        scale = options["scale"]
+        self.counts = {
+            name: max(1, int(options[name] * scale))
+            for name in ("users", "campaigns", "donations", "subscriptions", "conversations", "messages")
+        }
+        self.batch_size = options["batch_size"]
+        self.rng = np.random.default_rng(options["seed"])
+        self.now = timezone.now()
+        self.start = self.now - datetime.timedelta(days=options["days"])
+        self.day_weights = self.seasonal_weights(options["days"])
+
+        started = time.perf_counter()
+        user_ids = self.seed_users()
+        campaign_ids = self.seed_campaigns()
+        self.seed_donations(user_ids, campaign_ids)
+        self.seed_subscriptions(user_ids)
+        self.seed_conversations(user_ids)
+        self.seed_site_metrics(options["days"])
+        self.stdout.write(self.style.SUCCESS(f"Seeded in {time.perf_counter() - started:.1f}s: {self.counts}"))
+
+    # ---------------------------
+    # Distributions
+    # ---------------------------
+
+    def seasonal_weights(self, days):
+        """Per-day weights: steady growth, a December giving peak, quieter weekends."""
+        dates = [self.start + datetime.timedelta(days=i) for i in range(days)]
+        growth = np.linspace(0.6, 1.4, days)
+        season = np.array([1 + 0.5 * math.cos(2 * math.pi * (d.timetuple().tm_yday - 355) / 365) for d in dates])
+        weekday = np.array([0.75 if d.weekday() >= 5 else 1.0 for d in dates])
+        weights = growth * season * weekday
+        return weights / weights.sum()
+
+    def random_datetimes(self, size):
+        days = self.rng.choice(len(self.day_weights), size=size, p=self.day_weights)
+        seconds = self.rng.integers(0, 86_400, size=size)
+        return [self.start + datetime.timedelta(days=int(d), seconds=int(s)) for d, s in zip(days, seconds)]
+
+    def power_law(self, ids, exponent):
+        """
+        Sampler over `ids` with P(rank k) ~ k^-exponent, ranks shuffled so the heaviest
+        ids aren't simply the oldest: a few ids get most rows, the long tail gets one or two.
+        """
+        ids = self.rng.permutation(ids)
+        cdf = np.cumsum(np.arange(1, len(ids) + 1, dtype=float) ** -exponent)
+        cdf /= cdf[-1]
+        return lambda size: ids[np.searchsorted(cdf, self.rng.random(size), side="right").clip(max=len(ids) - 1)]
+
+    def progress(self, label, done, total, started):
+        self.stdout.write(f"  {label}: {done:,}/{total:,} ({time.perf_counter() - started:.1f}s)")
+
+    def in_batches(self, label, total, make_batch):
+        started = time.perf_counter()
+        done = 0
+        while done < total:
+            size = min(self.batch_size, total - done)
+            with transaction.atomic():
+                make_batch(done, size)
+            done += size
+            self.progress(label, done, total, started)
+
+    # ---------------------------
+    # Seeders
+    # ---------------------------
+
+    def seed_users(self):
+        total = self.counts["users"]
+        offset = User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").count()
+
+        def batch(done, size):
+            joined = self.random_datetimes(size)
+            # Roughly a third logged in within the last month, the rest drifted away
+            recency = self.rng.exponential(45, size=size)
+            User.objects.bulk_create([
+                User(
+                    email=f"user{offset + done + i}@{EMAIL_DOMAIN}",
+                    password="!",  # unusable, skips hashing
+                    first_name=FIRST_NAMES[(done + i) % len(FIRST_NAMES)],
+                    last_name=LAST_NAMES[(done + i) // len(FIRST_NAMES) % len(LAST_NAMES)],
+                    is_verified=True,
+                    date_joined=joined[i],
+                    last_login=max(joined[i], self.now - datetime.timedelta(days=float(recency[i]))),
+                )
+                for i in range(size)
+            ])
+
+        self.in_batches("users", total, batch)
+        return np.array(User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").values_list("id", flat=True))
+
+    def seed_campaigns(self):
+        total = self.counts["campaigns"]
+        goals = np.round(self.rng.lognormal(9, 1, size=total), -2).clip(500, 5_000_000)
+        created = self.random_datetimes(total)
+        with explicit_timestamps(DonationCampaign._meta.get_field("created_at")):
+            self.in_batches("campaigns", total, lambda done, size: DonationCampaign.objects.bulk_create([
+                DonationCampaign(
+                    title=f"{CAUSES[(done + i) % len(CAUSES)]} #{done + i}",
+                    organization=ORGANIZATIONS[(done + i) % len(ORGANIZATIONS)],
+                    description="Generated for load testing.",
+                    goal_amount=Decimal(str(goals[done + i])),
+                    is_active=self.rng.random() < 0.7,
+                    created_at=created[done + i],
+                )
+                for i in range(size)
+            ]))
+        return np.array(DonationCampaign.objects.order_by("id").values_list("id", flat=True))
+
+    def seed_donations(self, user_ids, campaign_ids):
+        total = self.counts["donations"]
+        statuses = np.array(["completed", "pending", "failed"])
+        offset = Donation.objects.count()
+        pick_donor = self.power_law(user_ids, 0.8)
+        pick_campaign = self.power_law(campaign_ids, 1.1)
+
+        def batch(done, size):
+            donors = pick_donor(size)
+            guests = self.rng.random(size) < 0.3
+            campaigns = pick_campaign(size)
+            general = self.rng.random(size) < 0.1
+            amounts = np.round(self.rng.lognormal(3.2, 1.0, size=size), 2).clip(1, 10_000)
+            status = statuses[self.rng.choice(3, size=size, p=[0.92, 0.05, 0.03])]
+            rated = self.rng.random(size) < 0.2
+            ratings = self.rng.choice([1, 2, 3, 4, 5], size=size, p=[0.05, 0.05, 0.15, 0.35, 0.4])
+            donated = self.random_datetimes(size)
+            rows = [
+                Donation(
+                    user_id=None if guests[i] else int(donors[i]),
+                    campaign_id=None if general[i] else int(campaigns[i]),
+                    donor_name=f"Guest {donors[i] % 5000}" if guests[i] else None,
+                    donor_email=f"guest{donors[i] % 5000}@{EMAIL_DOMAIN}" if guests[i] else None,
+                    amount=Decimal(str(amounts[i])),
+                    payment_status=str(status[i]),
+                    transaction_id=f"cs_load_{offset + done + i}",
+                    rating=int(ratings[i]) if rated[i] else None,
+                    donated_at=donated[i],
+                )
+                for i in range(size)
+            ]
+            Donation.objects.bulk_create(rows)
+            # bulk_create skips Donation.save, so the batch is applied to the totals here
+            Donation.apply_completed([row for row in rows if row.payment_status == "completed"])
+            ratings = defaultdict(lambda: [0, 0])
+            for row in rows:
+                if row.campaign_id and row.rating:
+                    ratings[row.campaign_id][0] += row.rating
+                    ratings[row.campaign_id][1] += 1
+            for campaign_id, (rating_sum, rating_count) in ratings.items():
+                DonationCampaign.objects.filter(id=campaign_id).update(
+                    rating_sum=F("rating_sum") + rating_sum, rating_count=F("rating_count") + rating_count,
+                )
+
+        with explicit_timestamps(Donation._meta.get_field("donated_at")):
+            self.in_batches("donations", total, batch)
+
+    def seed_subscriptions(self, user_ids):
+        plans = []
+        for name, price, days in PLANS:
+            plan, _ = SubscriptionPlan.objects.get_or_create(name=name, defaults={"price": price, "duration_days": days})
+            plans.append(plan)
+        total = min(self.counts["subscriptions"], len(user_ids))
+        subscribers = self.rng.choice(user_ids, size=total, replace=False)
+
+        def batch(done, size):
+            starts = self.random_datetimes(size)
+            picks = self.rng.choice(len(plans), size=size, p=[0.7, 0.2, 0.1])
+            rows = []
+            for i in range(size):
+                plan = plans[picks[i]]
+                end = starts[i] + datetime.timedelta(days=plan.duration_days)
+                rows.append(UserSubscription(
+                    user_id=int(subscribers[done + i]), plan=plan, start_date=starts[i], end_date=end,
+                    is_active=end > self.now, payment_status="completed",
+                    transaction_id=f"cs_load_sub_{done + i}",
+                ))
+            UserSubscription.objects.bulk_create(rows)
+            User.objects.filter(id__in=[row.user_id for row in rows if row.is_active]).update(is_subscribed=True)
+
+        with explicit_timestamps(UserSubscription._meta.get_field("start_date")):
+            self.in_batches("subscriptions", total, batch)
+
+    def seed_conversations(self, user_ids):
+        total = self.counts["conversations"]
+        started = self.random_datetimes(total)
+        fields = [Conversation._meta.get_field("created_at"), Message._meta.get_field("created_at"),
+                  Message._meta.get_field("updated_at")]
+        with explicit_timestamps(*fields):
+            first_id = (Conversation.objects.order_by("-id").values_list("id", flat=True).first() or 0) + 1
+            pick_owner = self.power_law(user_ids, 1.0)
+            self.in_batches("conversations", total, lambda done, size: Conversation.objects.bulk_create([
+                Conversation(
+                    user_id=int(owner), title=f"Chat {done + i}", mode="coach" if (done + i) % 3 else "friend",
+                    created_at=started[done + i],
+                )
+                for i, owner in enumerate(pick_owner(size))
+            ]))
+            conversation_ids = np.array(
+                Conversation.objects.filter(id__gte=first_id).order_by("id").values_list("id", flat=True)
+            )
+
+            pick_conversation = self.power_law(conversation_ids, 0.7)
+
+            def batch(done, size):
+                owners = pick_conversation(size)
+                lengths = self.rng.integers(3, 60, size=size)
+                created = self.random_datetimes(size)
+                Message.objects.bulk_create([
+                    Message(
+                        conversation_id=int(owners[i]),
+                        role="user" if (done + i) % 2 == 0 else "ai",
+                        content=" ".join(self.rng.choice(WORDS, size=int(lengths[i]))),
+                        created_at=created[i], updated_at=created[i],
+                    )
+                    for i in range(size)
+                ])
+
+            self.in_batches("messages", self.counts["messages"], batch)
+
+    def seed_site_metrics(self, days):
+        visits = (self.day_weights * self.counts["users"] * 20 * self.rng.lognormal(0, 0.1, size=days)).astype(int)
+        SiteMetric.objects.bulk_create([
+            SiteMetric(
+                date=(self.start + datetime.timedelta(days=i)).date(),
+                visits_count=int(visits[i]), views_count=int(visits[i] * self.rng.uniform(2.5, 4.5)),
+            )
+            for i in range(days)
+        ], batch_size=self.batch_size, ignore_conflicts=True)
+
+        revenue = {}
+        for row in UserSubscription.objects.values("start_date", "plan__price").iterator(chunk_size=self.batch_size):
+            month = row["start_date"].date().replace(day=1)
+            revenue[month] = revenue.get(month, Decimal("0")) + row["plan__price"]
+        Earning.objects.bulk_create(
+            [Earning(month=month, amount=amount) for month, amount in revenue.items()], ignore_conflicts=True
+        )
+        self.stdout.write(f"  site metrics: {days} days, earnings: {len(revenue)} months")
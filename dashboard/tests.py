@@ -1,3 +1,104 @@
+import io
+import json
+import tempfile
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db.models import Count, Sum
 from django.test import TestCase
 
-# Create your tests here.
+from chat.models import Message
+from dashboard.models import SiteMetric
+from donation.models import Donation, DonationCampaign, DonorTotal, LeaderboardEntry, TotalDonation
+from users.models import User
+
+
+class SeedLoadDataTests(TestCase):
+
+    def test_seeds_every_app_and_applies_donation_totals(self):
+        call_command(
+            'seed_load_data', users=40, campaigns=4, donations=500, subscriptions=10, conversations=8,
+            messages=60, days=60, batch_size=128, force=True, stdout=io.StringIO(),
+        )
+
+        self.assertEqual(User.objects.filter(email__endswith='@load.test').count(), 40)
+        self.assertEqual(Donation.objects.count(), 500)
+        self.assertEqual(Message.objects.count(), 60)
+        self.assertEqual(SiteMetric.objects.count(), 60)
+
+        completed = Donation.objects.filter(payment_status='completed')
+        expected = completed.aggregate(total_amount=Sum('amount'), total_count=Count('id'))
+        self.assertEqual(TotalDonation.totals(), expected)
+        self.assertEqual(DonorTotal.objects.aggregate(n=Sum('donation_count'))['n'], expected['total_count'])
+        campaign = DonationCampaign.objects.order_by('-supporters').first()
+        self.assertEqual(campaign.supporters, completed.filter(campaign=campaign).count())
+        self.assertEqual(
+            (campaign.rating_sum, campaign.rating_count),
+            tuple(campaign.donations.aggregate(Sum('rating'), Count('rating')).values()),
+        )
+        self.assertEqual(
+            LeaderboardEntry.objects.filter(campaign__isnull=True).aggregate(n=Sum('donation_count'))['n'],
+            expected['total_count'],
+        )
+
+    def test_refuses_without_debug_unless_forced(self):
+        with self.assertRaises(CommandError):
+            call_command('seed_load_data', users=1, stdout=io.StringIO())
+
+
+class BenchmarkEndpointsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_load_data', users=20, campaigns=3, donations=200, subscriptions=5, conversations=6,
+            messages=30, days=30, force=True, stdout=io.StringIO(),
+        )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.baseline = Path(directory.name) / 'baselines.json'
+
+    def benchmark(self, **options):
+        call_command(
+            'benchmark_endpoints', iterations=2, warmup=1, baseline=str(self.baseline),
+            stdout=io.StringIO(), **options,
+        )
+
+    def test_update_baseline_records_every_endpoint(self):
+        self.benchmark(update_baseline=True)
+
+        endpoints = json.loads(self.baseline.read_text())['endpoints']
+        self.assertIn('conversation_messages', endpoints)
+        self.assertEqual(endpoints['donations']['queries'], 1)
+        self.assertGreater(endpoints['users_active']['peak_kb'], 0)
+        self.assertGreater(endpoints['donations_public_summary']['queries'], 0)
+        self.assertNotIn('p95_ms', endpoints['donations'])
+
+    def test_cold_runs_leave_the_configured_cache_alone(self):
+        cache.set('unrelated', 'kept')
+
+        self.benchmark(update_baseline=True, only='donations,donations_public_summary', cold=True)
+
+        self.assertEqual(cache.get('unrelated'), 'kept')
+
+    def test_query_count_above_baseline_fails(self):
+        self.benchmark(update_baseline=True, only='donations,dashboard_stats')
+        payload = json.loads(self.baseline.read_text())
+        payload['endpoints']['dashboard_stats']['queries'] -= 1
+        self.baseline.write_text(json.dumps(payload))
+
+        with self.assertRaisesMessage(CommandError, '1 endpoint budget(s) exceeded'):
+            self.benchmark(only='donations,dashboard_stats', threshold=100)
+
+    def test_baseline_from_a_different_dataset_is_rejected(self):
+        self.benchmark(update_baseline=True, only='donations')
+        payload = json.loads(self.baseline.read_text())
+        payload['meta']['donations'] = 10000
+        self.baseline.write_text(json.dumps(payload))
+
+        with self.assertRaisesMessage(CommandError, 'this database has'):
+            self.benchmark(only='donations', threshold=100)
+        self.benchmark(only='donations', threshold=100, allow_dataset_mismatch=True)
@@ -5,3 +5,8 @@ class DonationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'donation'
 
+    def ready(self):
+        from . import checks  # noqa: F401  registers the deploy checks
+        from .stripe_client import configure_stripe
+
+        configure_stripe()
@@ -0,0 +1,98 @@
+# donation/cache.py
+
+import hashlib
+import json
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+DONATIONS_TAG = 'donations'
+
+# How long a recompute may hold the refresh lock, and how long a cold-cache request
+# waits for another request's recompute before computing itself
+LOCK_SECONDS = 30
+COLD_WAIT_SECONDS = 2
+
+
+def _tag_key(tag):
+    return f'cachetag:{tag}'
+
+
+def tag_version(tag):
+    return cache.get(_tag_key(tag), 0)
+
+
+def invalidate_tag(tag):
+    """Mark every response cached under `tag` as stale. Never expires, so old versions can't come back."""
+    cache.set(_tag_key(tag), time.time_ns(), None)
+
+
+def invalidate_donation_stats_on_commit():
+    transaction.on_commit(lambda: invalidate_tag(DONATIONS_TAG))
+
+
+def cache_public_stats(tag=DONATIONS_TAG, query=None):
+    """
+    Cache a GET handler's Response data per path and query with stale-while-revalidate.
+
+    The key is built from the `query` serializer's validated data, so unknown or
+    reordered parameters share one entry; without a serializer the query string is
+    ignored. Invalid parameters raise ValidationError before anything is cached.
+
+    An entry is fresh for PUBLIC_STATS_CACHE_SECONDS and while its tag is unchanged.
+    Once stale, the first request takes a lock and recomputes; concurrent requests
+    keep getting the stale copy meanwhile, so an invalidation costs one recompute.
+    """
+    def decorator(get):
+        @wraps(get)
+        def wrapper(self, request, *args, **kwargs):
+            params = {}
+            if query is not None:
+                serializer = query(data=request.query_params)
+                serializer.is_valid(raise_exception=True)
+                params = serializer.validated_data
+            digest = hashlib.md5(f'{request.path}?{json.dumps(params, sort_keys=True, default=str)}'.encode()).hexdigest()
+            key, lock_key = f'publicstats:{digest}', f'publicstats:{digest}:lock'
+            version = tag_version(tag)
+
+            entry = cache.get(key)
+            if entry and entry['version'] == version and entry['fresh_until'] > time.time():
+                return Response(entry['data'], status=entry['status'])
+
+            locked = cache.add(lock_key, 1, LOCK_SECONDS)
+            if not locked:
+                if entry:
+                    return Response(entry['data'], status=entry['status'])
+                entry = _wait_for(key)
+                if entry:
+                    return Response(entry['data'], status=entry['status'])
+
+            try:
+                response = get(self, request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(key, {
+                        'data': response.data,
+                        'status': response.status_code,
+                        'version': version,
+                        'fresh_until': time.time() + settings.PUBLIC_STATS_CACHE_SECONDS,
+                    }, settings.PUBLIC_STATS_STALE_SECONDS)
+                return response
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+        return wrapper
+    return decorator
+
+
+def _wait_for(key):
+    deadline = time.monotonic() + COLD_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry:
+            return entry
+    return None
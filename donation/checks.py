@@ -0,0 +1,22 @@
+# donation/checks.py
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+PROCESS_LOCAL_CHANNEL_LAYER = 'channels.layers.InMemoryChannelLayer'
+
+
+@register(deploy=True)
+def check_shared_channel_layer(app_configs, **kwargs):
+    """
+    Campaign progress is pushed from whichever process completes the donation, usually
+    the Stripe inbox worker, while the sockets live in the ASGI processes.
+    """
+    backend = settings.CHANNEL_LAYERS['default']['BACKEND']
+    if backend == PROCESS_LOCAL_CHANNEL_LAYER:
+        return [Error(
+            f"The default channel layer ({backend}) is private to each process.",
+            hint="Set REDIS_URL so the inbox worker can reach the ASGI processes' sockets.",
+            id='donation.E002',
+        )]
+    return []
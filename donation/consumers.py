@@ -0,0 +1,23 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .realtime import ALL_CAMPAIGNS_GROUP, campaign_group
+
+
+class CampaignProgressConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Read-only feed of campaign progress deltas
+    ({campaign, raised_amount, supporters, progress}).
+    ws/campaigns/ receives every campaign, ws/campaigns/<id>/ only that one.
+    """
+
+    async def connect(self):
+        campaign_id = self.scope['url_route']['kwargs'].get('campaign_id')
+        self.group = campaign_group(campaign_id) if campaign_id else ALL_CAMPAIGNS_GROUP
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def campaign_progress(self, event):
+        await self.send_json(event['data'])
@@ -0,0 +1,70 @@
+# donation/fake_stripe.py
+
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    """Answers the Stripe calls this project makes, after `server.latency` seconds."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode())
+        time.sleep(self.server.latency)
+
+        if self.path.rstrip('/') == '/v1/checkout/sessions':
+            session_id = f'cs_fake_{next(self.server.ids)}'
+            self.respond(200, {
+                'id': session_id,
+                'object': 'checkout.session',
+                'mode': form.get('mode', ['payment'])[0],
+                'status': 'open',
+                'url': f'https://checkout.stripe.test/pay/{session_id}',
+            })
+        else:
+            self.respond(404, {'error': {'type': 'invalid_request_error', 'message': f'Unrecognized request URL (POST: {self.path})'}})
+
+    def respond(self, status_code, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeStripeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0):
+        super().__init__(address, FakeStripeHandler)
+        self.latency = latency
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+
+    @property
+    def api_base(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+def start_fake_stripe(port=0, latency=0.0):
+    """Serve a FakeStripeServer on a daemon thread; call shutdown() when done."""
+    server = FakeStripeServer(('127.0.0.1', port), latency=latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
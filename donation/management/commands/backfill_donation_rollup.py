@@ -0,0 +1,64 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from donation.cache import invalidate_donation_stats_on_commit
+from donation.models import Donation, DonationDailyRollup
+
+
+def _parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value) if value else None
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = "Rebuild DonationDailyRollup from completed donations, optionally only for a date range."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="First day to rebuild (YYYY-MM-DD), default: beginning of time.")
+        parser.add_argument("--end", help="Last day to rebuild (YYYY-MM-DD), default: today.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        start, end = _parse_date(options["start"]), _parse_date(options["end"])
+        donations = Donation.objects.filter(payment_status='completed')
+        rollups = DonationDailyRollup.objects.all()
+        # Filter on the raw timestamp so the (payment_status, donated_at) index is usable
+        if start:
+            donations = donations.filter(donated_at__gte=timezone.make_aware(datetime.datetime.combine(start, datetime.time.min)))
+            rollups = rollups.filter(date__gte=start)
+        if end:
+            donations = donations.filter(donated_at__lt=timezone.make_aware(datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min)))
+            rollups = rollups.filter(date__lte=end)
+
+        daily = (
+            donations.annotate(day=TruncDate('donated_at'))
+            .values('day', 'campaign_id')
+            .annotate(total=Sum('amount'), count=Count('id'))
+            .order_by()
+        )
+
+        created = 0
+        with transaction.atomic():
+            rollups.delete()
+            batch = []
+            for row in daily.iterator(chunk_size=options["batch_size"]):
+                batch.append(DonationDailyRollup(
+                    date=row['day'], campaign_id=row['campaign_id'],
+                    total_amount=row['total'], donation_count=row['count'],
+                ))
+                if len(batch) >= options["batch_size"]:
+                    DonationDailyRollup.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            DonationDailyRollup.objects.bulk_create(batch)
+            created += len(batch)
+            invalidate_donation_stats_on_commit()
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {created} daily rollup rows"))
@@ -0,0 +1,70 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+
+from donation.cache import invalidate_donation_stats_on_commit
+from donation.models import Donation, DonorTotal, guest_donor_key
+
+
+class Command(BaseCommand):
+    help = "Rebuild DonorTotal from completed donations."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        completed = Donation.objects.filter(payment_status='completed')
+        by_user = (
+            completed.filter(user__isnull=False)
+            .values('user_id', 'user__email')
+            .annotate(total=Sum('amount'), count=Count('id'), last=Max('donated_at'))
+            .order_by()
+        )
+        # Guests are grouped by their raw email/name in SQL and folded into donor keys by
+        # guest_donor_key, the same normalisation Donation.save uses
+        by_guest = (
+            completed.filter(user__isnull=True)
+            .values('donor_email', 'donor_name')
+            .annotate(total=Sum('amount'), count=Count('id'), last=Max('donated_at'))
+            .order_by()
+        )
+        guests = {}
+        for row in by_guest.iterator(chunk_size=options["batch_size"]):
+            key = guest_donor_key(row['donor_email'], row['donor_name'])
+            guest = guests.setdefault(key, {'total': Decimal('0.00'), 'count': 0, 'last': None, 'name': None, 'email': None})
+            guest['total'] += row['total']
+            guest['count'] += row['count']
+            guest['last'] = max(filter(None, (guest['last'], row['last'])))
+            guest['name'] = max(filter(None, (guest['name'], row['donor_name'])), default=None)
+            guest['email'] = max(filter(None, (guest['email'], row['donor_email'])), default=None)
+
+        def rows():
+            for row in by_user.iterator(chunk_size=options["batch_size"]):
+                yield DonorTotal(
+                    donor_key=f"user:{row['user_id']}", user_id=row['user_id'], display_name=row['user__email'],
+                    total_amount=row['total'], donation_count=row['count'], last_donated_at=row['last'],
+                )
+            for key, row in guests.items():
+                name = row['name'] if row['name'] and row['name'] != 'Guest' else (row['email'] or 'Guest')
+                yield DonorTotal(
+                    donor_key=key, display_name=name,
+                    total_amount=row['total'], donation_count=row['count'], last_donated_at=row['last'],
+                )
+
+        created = 0
+        with transaction.atomic():
+            DonorTotal.objects.all().delete()
+            batch = []
+            for donor in rows():
+                batch.append(donor)
+                if len(batch) >= options["batch_size"]:
+                    DonorTotal.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            DonorTotal.objects.bulk_create(batch)
+            created += len(batch)
+            invalidate_donation_stats_on_commit()
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {created} donor totals"))
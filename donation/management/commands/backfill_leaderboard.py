@@ -0,0 +1,80 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from donation.cache import invalidate_donation_stats_on_commit
+from donation.models import Donation, LeaderboardEntry, guest_donor_key, public_donor_name
+
+
+class Command(BaseCommand):
+    help = "Rebuild LeaderboardEntry (per campaign and overall) from completed donations."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        completed = Donation.objects.filter(payment_status='completed')
+        by_user = (
+            completed.filter(user__isnull=False)
+            .values('campaign_id', 'user_id', 'user__first_name', 'user__last_name')
+            .annotate(total=Sum('amount'), count=Count('id'))
+            .order_by()
+        )
+        # Guests are grouped by their raw email/name in SQL and folded into donor keys by
+        # guest_donor_key, the same normalisation Donation.save uses
+        by_guest = (
+            completed.filter(user__isnull=True)
+            .values('campaign_id', 'donor_email', 'donor_name')
+            .annotate(total=Sum('amount'), count=Count('id'))
+            .order_by()
+        )
+        guests = {}
+        for row in by_guest.iterator(chunk_size=options["batch_size"]):
+            key = (row['campaign_id'], guest_donor_key(row['donor_email'], row['donor_name']))
+            guest = guests.setdefault(key, {'campaign_id': row['campaign_id'], 'total': Decimal('0.00'), 'count': 0, 'name': None})
+            guest['total'] += row['total']
+            guest['count'] += row['count']
+            guest['name'] = max(filter(None, (guest['name'], row['donor_name'])), default=None)
+
+        # Per-campaign groups come from the database; the overall board is their sum per donor
+        overall = defaultdict(lambda: [None, Decimal('0.00'), 0])
+
+        def rows():
+            for row in by_user.iterator(chunk_size=options["batch_size"]):
+                name = public_donor_name(f"{row['user__first_name'] or ''} {row['user__last_name'] or ''}")
+                yield f"user:{row['user_id']}", name, row
+            for (_, donor_key), row in guests.items():
+                yield donor_key, public_donor_name(row['name']), row
+
+        def entries():
+            for donor_key, name, row in rows():
+                total = overall[donor_key]
+                total[0] = name
+                total[1] += row['total']
+                total[2] += row['count']
+                if row['campaign_id']:
+                    yield LeaderboardEntry(
+                        campaign_id=row['campaign_id'], donor_key=donor_key, public_name=name,
+                        total_amount=row['total'], donation_count=row['count'],
+                    )
+            for donor_key, (name, amount, count) in overall.items():
+                yield LeaderboardEntry(donor_key=donor_key, public_name=name, total_amount=amount, donation_count=count)
+
+        created = 0
+        with transaction.atomic():
+            LeaderboardEntry.objects.all().delete()
+            batch = []
+            for entry in entries():
+                batch.append(entry)
+                if len(batch) >= options["batch_size"]:
+                    LeaderboardEntry.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            LeaderboardEntry.objects.bulk_create(batch)
+            created += len(batch)
+            invalidate_donation_stats_on_commit()
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {created} leaderboard entries"))
@@ -0,0 +1,58 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import stripe
+from django.core.management.base import BaseCommand
+
+from donation.fake_stripe import start_fake_stripe
+from donation.stripe_client import stripe_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Create checkout sessions through the configured Stripe client and report latency. "
+        "Runs against an in-process fake Stripe unless --live is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--latency-ms", type=float, default=50, help="Fake server response delay")
+        parser.add_argument("--live", action="store_true", help="Use STRIPE_API_BASE instead of the fake server")
+
+    def handle(self, *args, **options):
+        server = None
+        if not options["live"]:
+            server = start_fake_stripe(latency=options["latency_ms"] / 1000)
+            stripe.api_base = server.api_base
+
+        def create_session(i):
+            stripe.checkout.Session.create(
+                payment_method_types=["card"],
+                line_items=[{
+                    "price_data": {
+                        "currency": "usd",
+                        "product_data": {"name": "Benchmark"},
+                        "unit_amount": 500,
+                    },
+                    "quantity": 1,
+                }],
+                mode="payment",
+                success_url="myapp://payment-success",
+                cancel_url="myapp://payment-cancel",
+            )
+
+        stripe_stats.reset()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            list(pool.map(create_session, range(options["requests"])))
+        elapsed = time.perf_counter() - started
+
+        report = stripe_stats.snapshot()
+        report["throughput_rps"] = round(options["requests"] / elapsed, 1)
+        if server is not None:
+            report["connections_opened"] = server.connections
+            server.shutdown()
+            server.server_close()
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,22 @@
+"""
+Folds the TotalDonation counter shards back into row 1. Totals are correct without
+it (readers sum every shard); it only keeps the shard rows from drifting apart.
+Schedule it outside the web process, e.g. hourly from cron:
+
+    0 * * * *  cd /srv/app && ./venv/bin/python manage.py compact_donation_totals
+
+or with a systemd timer (OnCalendar=hourly) whose service runs the same command.
+"""
+
+from django.core.management.base import BaseCommand
+
+from donation.models import TotalDonation
+
+
+class Command(BaseCommand):
+    help = "Fold the TotalDonation counter shards into a single row (schedule hourly from cron or a systemd timer)."
+
+    def handle(self, *args, **options):
+        TotalDonation.compact()
+        totals = TotalDonation.totals()
+        self.stdout.write(f"Compacted: ${totals['total_amount']} from {totals['total_count']} donations")
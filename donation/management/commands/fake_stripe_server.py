@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from donation.fake_stripe import FakeStripeServer
+
+
+class Command(BaseCommand):
+    help = "Serve a local fake of the Stripe API for offline benchmarking (set STRIPE_API_BASE to its address)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--port", type=int, default=12111)
+        parser.add_argument("--latency-ms", type=float, default=50, help="Delay added to every response")
+
+    def handle(self, *args, **options):
+        server = FakeStripeServer(("127.0.0.1", options["port"]), latency=options["latency_ms"] / 1000)
+        self.stdout.write(f"Fake Stripe listening, set STRIPE_API_BASE={server.api_base}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Served {server.connections} connections")
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from donation.models import DonationCampaign
+from main.thumbnails import AVATAR_VARIANTS, CAMPAIGN_VARIANTS, generate_variants
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Render resized WebP/JPEG variants for campaign thumbnails and profile pictures that don't have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Regenerate variants for every image")
+
+    def handle(self, *args, **options):
+        targets = [
+            (DonationCampaign, "thumbnail", "thumbnail_variants", CAMPAIGN_VARIANTS),
+            (User, "profile_picture", "profile_picture_variants", AVATAR_VARIANTS),
+        ]
+        for model, field_name, variants_field, sizes in targets:
+            rows = model.objects.exclude(**{field_name: ""}).exclude(**{f"{field_name}__isnull": True})
+            done = 0
+            for pk, source, variants in rows.values_list("pk", field_name, variants_field).iterator():
+                if not options["force"] and (variants or {}).get("source") == source:
+                    continue
+                generate_variants(model._meta.label, pk, field_name, variants_field, sizes)
+                done += 1
+            self.stdout.write(f"{model._meta.label}: generated variants for {done} images")
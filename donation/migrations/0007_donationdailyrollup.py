@@ -0,0 +1,43 @@
+# Generated by Django 4.2.18 on 2026-10-19 12:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donation', '0006_donationcampaign_donation_campaign'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonationDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('donation_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['payment_status', 'donated_at'], name='donation_do_payment_56f8ce_idx'),
+        ),
+        migrations.AddField(
+            model_name='donationdailyrollup',
+            name='campaign',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='donation.donationcampaign'),
+        ),
+        migrations.AddConstraint(
+            model_name='donationdailyrollup',
+            constraint=models.UniqueConstraint(fields=('date', 'campaign'), name='donation_rollup_date_campaign'),
+        ),
+        migrations.AddConstraint(
+            model_name='donationdailyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('campaign__isnull', True)), fields=('date',), name='donation_rollup_date_no_campaign'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.18 on 2026-10-19 12:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('donation', '0007_donationdailyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonorTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('donor_key', models.CharField(max_length=300, unique=True)),
+                ('display_name', models.CharField(max_length=255)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('donation_count', models.PositiveIntegerField(default=0)),
+                ('last_donated_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='donor_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-total_amount', '-id'],
+                'indexes': [models.Index(fields=['-total_amount', '-id'], name='donation_do_total_a_b46f73_idx')],
+            },
+        ),
+    ]
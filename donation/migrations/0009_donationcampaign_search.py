@@ -0,0 +1,41 @@
+# Generated by Django 4.2.18 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+def search_index():
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    return GinIndex(
+        SearchVector('title', weight='A', config='english')
+        + SearchVector('organization', weight='B', config='english')
+        + SearchVector('description', weight='C', config='english'),
+        name='campaign_search_idx',
+    )
+
+
+def add_search_index(apps, schema_editor):
+    # Full-text search only exists on PostgreSQL; other backends fall back to icontains
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_index(apps.get_model('donation', 'DonationCampaign'), search_index())
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(apps.get_model('donation', 'DonationCampaign'), search_index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donation', '0008_donortotal'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donationcampaign',
+            index=models.Index(fields=['is_active', '-created_at'], name='campaign_active_created_idx'),
+        ),
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
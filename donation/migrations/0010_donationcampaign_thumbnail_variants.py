@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2026-10-19 12:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donation', '0009_donationcampaign_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donationcampaign',
+            name='thumbnail_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.18 on 2026-10-19 12:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donation', '0010_donationcampaign_thumbnail_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('donor_key', models.CharField(max_length=300)),
+                ('public_name', models.CharField(max_length=255)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('donation_count', models.PositiveIntegerField(default=0)),
+                ('campaign', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard', to='donation.donationcampaign')),
+            ],
+            options={
+                'ordering': ['-total_amount', '-id'],
+                'indexes': [models.Index(fields=['campaign', '-total_amount', '-id'], name='leaderboard_rank_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardentry',
+            constraint=models.UniqueConstraint(fields=('campaign', 'donor_key'), name='leaderboard_campaign_donor'),
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('campaign__isnull', True)), fields=('donor_key',), name='leaderboard_overall_donor'),
+        ),
+    ]
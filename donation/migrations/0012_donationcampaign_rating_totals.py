@@ -0,0 +1,40 @@
+# Generated by Django 4.2.18 on 2026-10-19 12:21
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_rating_totals(apps, schema_editor):
+    Donation = apps.get_model('donation', 'Donation')
+    DonationCampaign = apps.get_model('donation', 'DonationCampaign')
+    totals = (
+        Donation.objects.filter(campaign__isnull=False, rating__isnull=False)
+        .values('campaign_id')
+        .annotate(rating_sum=Sum('rating'), rating_count=Count('id'))
+        .order_by()
+    )
+    for row in totals:
+        DonationCampaign.objects.filter(pk=row['campaign_id']).update(
+            rating_sum=row['rating_sum'], rating_count=row['rating_count'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donation', '0011_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donationcampaign',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='donationcampaign',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_rating_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.18 on 2026-10-19 12:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donation', '0012_donationcampaign_rating_totals'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='donation',
+            name='donation_do_payment_56f8ce_idx',
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['-donated_at', '-id'], name='donation_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['campaign', '-donated_at', '-id'], name='donation_campaign_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['payment_status', '-donated_at', '-id'], name='donation_status_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(condition=models.Q(('payment_status', 'completed')), fields=['user', 'amount'], name='donation_user_completed_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.18 on 2026-10-19 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donation', '0013_donation_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='donationdailyrollup',
+            name='donation_rollup_date_campaign',
+        ),
+        migrations.RemoveConstraint(
+            model_name='donationdailyrollup',
+            name='donation_rollup_date_no_campaign',
+        ),
+        migrations.AddField(
+            model_name='donationdailyrollup',
+            name='shard',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='donationdailyrollup',
+            constraint=models.UniqueConstraint(fields=('date', 'campaign', 'shard'), name='donation_rollup_date_campaign_shard'),
+        ),
+        migrations.AddConstraint(
+            model_name='donationdailyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('campaign__isnull', True)), fields=('date', 'shard'), name='donation_rollup_date_no_campaign_shard'),
+        ),
+    ]
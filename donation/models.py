@@ -1,7 +1,61 @@
-from django.db import models
+import random
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, models, transaction
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When, prefetch_related_objects
+from django.db.models.functions import Round
 from django.conf import settings
 from django.utils import timezone
 
+from main.counters import increment_or_create, increment_or_create_many
+from main.thumbnails import CAMPAIGN_VARIANTS, sync_image_variants
+
+from .cache import invalidate_donation_stats_on_commit
+from .realtime import notify_campaign_progress
+
+
+def campaign_search_vector():
+    """
+    Weighted tsvector over title, organization and description. Migration 0009 builds
+    a GIN index on exactly this expression on PostgreSQL; keep the two in sync.
+    """
+    from django.contrib.postgres.search import SearchVector
+
+    return (
+        SearchVector('title', weight='A', config='english')
+        + SearchVector('organization', weight='B', config='english')
+        + SearchVector('description', weight='C', config='english')
+    )
+
+
+class CampaignQuerySet(models.QuerySet):
+
+    def with_progress(self):
+        """Annotate `progress` (percent of goal raised, 2 decimals) in the database."""
+        return self.annotate(progress=Case(
+            When(goal_amount__gt=0, then=Round(F('raised_amount') * 100 / F('goal_amount'), 2)),
+            default=Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ))
+
+    def search(self, query):
+        """
+        Full-text match on PostgreSQL (served by the GIN index); on other databases every
+        word has to appear in the title, organization or description.
+        """
+        if connection.vendor == 'postgresql':
+            from django.contrib.postgres.search import SearchQuery
+
+            return self.annotate(search=campaign_search_vector()).filter(
+                search=SearchQuery(query, search_type='websearch', config='english'),
+            )
+        for word in query.split():
+            self = self.filter(
+                Q(title__icontains=word) | Q(organization__icontains=word) | Q(description__icontains=word)
+            )
+        return self
+
 
 class DonationCampaign(models.Model):
     """
@@ -16,18 +70,55 @@ class DonationCampaign(models.Model):
     raised_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
     supporters = models.PositiveIntegerField(default=0)
     thumbnail = models.ImageField(upload_to='campaigns/', blank=True, null=True)
+    thumbnail_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Running sum and count of donation ratings, kept current by Donation.rate / Donation.apply_ratings
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CampaignQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', '-created_at'], name='campaign_active_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        sync_image_variants(self, 'thumbnail', 'thumbnail_variants', CAMPAIGN_VARIANTS)
+
     def progress_percentage(self):
+        if getattr(self, 'progress', None) is not None:
+            return self.progress.quantize(Decimal('0.01'))
         if self.goal_amount > 0:
             return round((self.raised_amount / self.goal_amount) * 100, 2)
         return 0.0
 
+    def average_rating(self):
+        if self.rating_count:
+            return round(Decimal(self.rating_sum) / self.rating_count, 2)
+        return None
+
     def __str__(self):
         return f"{self.title} ({self.organization})"
 
 
+def guest_donor_key(email, name):
+    """
+    Donor key for a donation without an account. Normalised in Python, never in SQL:
+    SQLite's LOWER/TRIM only fold ASCII and spaces, so the backfills call this too.
+    """
+    return f"guest:{(email or name or 'Guest').strip().lower()}"
+
+
+def public_donor_name(name):
+    name = (name or '').strip()
+    if not name or name == 'Guest' or '@' in name:
+        return 'Anonymous'
+    return name
+
+
 class Donation(models.Model):
     """
     A donation entry made by a user or anonymous guest.
@@ -64,26 +155,145 @@ class Donation(models.Model):
 
     class Meta:
         ordering = ['-donated_at']
+        # Shaped after the hot filters: newest-first listing (optionally per campaign or
+        # status) and per-user completed totals. donation.query_plans audits them in tests.
+        indexes = [
+            models.Index(fields=['-donated_at', '-id'], name='donation_recent_idx'),
+            models.Index(fields=['campaign', '-donated_at', '-id'], name='donation_campaign_recent_idx'),
+            models.Index(fields=['payment_status', '-donated_at', '-id'], name='donation_status_recent_idx'),
+            models.Index(
+                fields=['user', 'amount'], condition=Q(payment_status='completed'), name='donation_user_completed_idx'
+            ),
+        ]
 
     def __str__(self):
         name = self.donor_name or (self.user.email if self.user else 'Guest')
         return f"${self.amount} by {name} for {self.campaign.title}"
 
     def save(self, *args, **kwargs):
-        """Auto-update campaign totals and global totals on completed donation."""
+        """
+        Auto-update campaign totals and global totals on completed donation (see
+        apply_completed). The counters are bumped with F() expressions in the same
+        transaction as the insert, so concurrent donations never overwrite each other's increments.
+        """
         is_new = self.pk is None
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            if is_new and self.payment_status == 'completed':
+                Donation.apply_completed([self])
+
+    @classmethod
+    def apply_completed(cls, donations):
+        """
+        Fold newly saved completed donations into every aggregate that mirrors them:
+        campaign progress (pushed after commit), the global, daily, per-donor and
+        leaderboard totals, and the public stats cache. save() passes itself; bulk
+        writers pass their batch after bulk_create, which skips save(), and get one
+        increment per counter row however large the batch. Call inside the writer's
+        transaction.
+        """
+        if not donations:
+            return
+        prefetch_related_objects([donation for donation in donations if donation.user_id], 'user')
+        campaigns = defaultdict(lambda: [Decimal('0.00'), 0])
+        rollups = defaultdict(lambda: [Decimal('0.00'), 0])
+        donors, boards = {}, {}
+        for donation in donations:
+            if donation.campaign_id:
+                campaigns[donation.campaign_id][0] += donation.amount
+                campaigns[donation.campaign_id][1] += 1
+            rollup = rollups[(timezone.localdate(donation.donated_at), donation.campaign_id)]
+            rollup[0] += donation.amount
+            rollup[1] += 1
+            donor_key = donation.donor_key()
+            donor = donors.setdefault(
+                donor_key, [donation.user_id, donation.donor_display_name(), Decimal('0.00'), 0, donation.donated_at],
+            )
+            donor[2] += donation.amount
+            donor[3] += 1
+            donor[4] = max(donor[4], donation.donated_at)
+            for board in (None, donation.campaign_id) if donation.campaign_id else (None,):
+                entry = boards.setdefault((board, donor_key), [donation.donor_public_name(), Decimal('0.00'), 0])
+                entry[1] += donation.amount
+                entry[2] += 1
 
-        if is_new and self.payment_status == 'completed':
-            self.campaign.raised_amount += self.amount
-            self.campaign.supporters += 1
-            self.campaign.save()
-            TotalDonation.update_totals(self.amount)
+        for campaign_id, (amount, count) in campaigns.items():
+            DonationCampaign.objects.filter(pk=campaign_id).update(
+                raised_amount=F('raised_amount') + amount,
+                supporters=F('supporters') + count,
+            )
+            transaction.on_commit(lambda campaign_id=campaign_id: notify_campaign_progress(campaign_id))
+        TotalDonation.update_totals(sum((donation.amount for donation in donations), Decimal('0.00')), len(donations))
+        DonationDailyRollup.add_many(rollups)
+        DonorTotal.add_many(donors)
+        LeaderboardEntry.add_many(boards)
+        invalidate_donation_stats_on_commit()
+
+    def rate(self, rating):
+        """Set this donation's rating with a single-column write and update the campaign average."""
+        with transaction.atomic():
+            current = Donation.objects.select_for_update().filter(pk=self.pk).values_list('rating', flat=True).first()
+            self.rating = rating
+            self.save(update_fields=['rating'])
+            if self.campaign_id and current != rating:
+                DonationCampaign.objects.filter(pk=self.campaign_id).update(
+                    rating_sum=F('rating_sum') + rating - (current or 0),
+                    rating_count=F('rating_count') + int(current is None),
+                )
+
+    @classmethod
+    def apply_ratings(cls, ratings):
+        """
+        Apply {donation_id: rating} in one bulk_update and one counter update per
+        campaign. Returns the ids that exist.
+        """
+        deltas = defaultdict(lambda: [0, 0])
+        with transaction.atomic():
+            donations = list(cls.objects.select_for_update().filter(id__in=ratings).only('id', 'rating', 'campaign_id'))
+            changed = []
+            for donation in donations:
+                rating = ratings[donation.id]
+                if donation.rating == rating:
+                    continue
+                if donation.campaign_id:
+                    deltas[donation.campaign_id][0] += rating - (donation.rating or 0)
+                    deltas[donation.campaign_id][1] += int(donation.rating is None)
+                donation.rating = rating
+                changed.append(donation)
+            cls.objects.bulk_update(changed, ['rating'], batch_size=500)
+            for campaign_id, (rating_sum, rating_count) in deltas.items():
+                DonationCampaign.objects.filter(pk=campaign_id).update(
+                    rating_sum=F('rating_sum') + rating_sum,
+                    rating_count=F('rating_count') + rating_count,
+                )
+        return {donation.id for donation in donations}
+
+    def donor_key(self):
+        """Identity used to aggregate per donor: the account if any, else the guest's email or name."""
+        if self.user_id:
+            return f"user:{self.user_id}"
+        return guest_donor_key(self.donor_email, self.donor_name)
+
+    def donor_display_name(self):
+        if self.user_id:
+            return self.user.email
+        return self.donor_name if self.donor_name and self.donor_name != 'Guest' else (self.donor_email or 'Guest')
+
+    def donor_public_name(self):
+        """Name safe to show on public pages: never an email address."""
+        if self.user_id:
+            return public_donor_name(self.user.get_full_name())
+        return public_donor_name(self.donor_name)
 
 
 class TotalDonation(models.Model):
     """
     Keeps track of global donation stats.
+
+    The stats are spread over up to TOTAL_DONATION_SHARDS rows (ids 1..N) so that
+    concurrent donations increment different rows instead of queueing on one.
+    A single row is only a partial total: read through totals().
     """
 
     total_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
@@ -93,8 +303,145 @@ class TotalDonation(models.Model):
         return f"Total: ${self.total_amount} from {self.total_count} donations"
 
     @classmethod
-    def update_totals(cls, amount):
-        obj, _ = cls.objects.get_or_create(id=1)
-        obj.total_amount += amount
-        obj.total_count += 1
-        obj.save()
+    def update_totals(cls, amount, count=1):
+        shard = random.randint(1, settings.TOTAL_DONATION_SHARDS)
+        increment_or_create(cls, {'id': shard}, {'total_amount': amount, 'total_count': count})
+
+    @classmethod
+    def totals(cls):
+        result = cls.objects.aggregate(total_amount=Sum('total_amount'), total_count=Sum('total_count'))
+        return {
+            'total_amount': result['total_amount'] or Decimal('0.00'),
+            'total_count': result['total_count'] or 0,
+        }
+
+    @classmethod
+    def compact(cls):
+        """Fold every shard into row 1 and zero the others, under row locks."""
+        with transaction.atomic():
+            cls.objects.get_or_create(id=1)
+            shards = list(cls.objects.select_for_update().exclude(id=1).order_by('id'))
+            amount = sum((shard.total_amount for shard in shards), Decimal('0.00'))
+            count = sum(shard.total_count for shard in shards)
+            if not count and not amount:
+                return
+            cls.objects.filter(id=1).update(
+                total_amount=F('total_amount') + amount,
+                total_count=F('total_count') + count,
+            )
+            cls.objects.filter(id__in=[shard.id for shard in shards]).update(total_amount=0, total_count=0)
+
+
+class DonationDailyRollup(models.Model):
+    """
+    Completed donations summed per day and campaign (campaign is null for general
+    donations). Kept current by Donation.save; rebuild with backfill_donation_rollup.
+    Like TotalDonation, each (date, campaign) is spread over DONATION_ROLLUP_SHARDS
+    rows so concurrent donations don't queue on one row; readers sum the shards.
+    """
+
+    date = models.DateField()
+    campaign = models.ForeignKey(DonationCampaign, on_delete=models.CASCADE, related_name='daily_rollups', null=True, blank=True)
+    shard = models.PositiveSmallIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    donation_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'campaign', 'shard'], name='donation_rollup_date_campaign_shard'),
+            models.UniqueConstraint(
+                fields=['date', 'shard'], condition=Q(campaign__isnull=True), name='donation_rollup_date_no_campaign_shard'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date}: ${self.total_amount} from {self.donation_count} donations"
+
+    @classmethod
+    def add_many(cls, totals):
+        """Add {(date, campaign_id): (amount, count)}, each to a random shard."""
+        increment_or_create_many(cls, [
+            (
+                {'date': date, 'campaign_id': campaign_id, 'shard': random.randrange(settings.DONATION_ROLLUP_SHARDS)},
+                {'total_amount': amount, 'donation_count': count}, None, None,
+            )
+            for (date, campaign_id), (amount, count) in totals.items()
+        ])
+
+
+class DonorTotal(models.Model):
+    """
+    Completed donations summed per donor (see Donation.donor_key), kept current by
+    Donation.save so the admin summary can page through donors by total without
+    grouping the whole Donation table. Rebuild with backfill_donor_totals.
+    """
+
+    donor_key = models.CharField(max_length=300, unique=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='donor_totals')
+    display_name = models.CharField(max_length=255)
+    total_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    donation_count = models.PositiveIntegerField(default=0)
+    last_donated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-total_amount', '-id']
+        indexes = [models.Index(fields=['-total_amount', '-id'])]
+
+    def __str__(self):
+        return f"{self.display_name}: ${self.total_amount} from {self.donation_count} donations"
+
+    @classmethod
+    def add_many(cls, totals):
+        """Add {donor_key: (user_id, display_name, amount, count, last_donated_at)}."""
+        increment_or_create_many(cls, [
+            (
+                {'donor_key': donor_key}, {'total_amount': amount, 'donation_count': count},
+                {'last_donated_at': donated_at}, {'user_id': user_id, 'display_name': display_name},
+            )
+            for donor_key, (user_id, display_name, amount, count, donated_at) in totals.items()
+        ])
+
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Completed donations summed per donor and campaign, plus one row per donor with a
+    null campaign for the overall board. Kept current by Donation.save, so a top-K read
+    is a K-row scan of the (campaign, -total_amount, -id) index.
+    Rebuild with backfill_leaderboard.
+    """
+
+    campaign = models.ForeignKey(DonationCampaign, on_delete=models.CASCADE, related_name='leaderboard', null=True, blank=True)
+    donor_key = models.CharField(max_length=300)
+    public_name = models.CharField(max_length=255)
+    total_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    donation_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-total_amount', '-id']
+        indexes = [models.Index(fields=['campaign', '-total_amount', '-id'], name='leaderboard_rank_idx')]
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'donor_key'], name='leaderboard_campaign_donor'),
+            models.UniqueConstraint(
+                fields=['donor_key'], condition=Q(campaign__isnull=True), name='leaderboard_overall_donor'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.public_name}: ${self.total_amount}"
+
+    @classmethod
+    def top(cls, campaign_id, limit):
+        return cls.objects.filter(campaign_id=campaign_id).order_by('-total_amount', '-id')[:limit]
+
+    @classmethod
+    def add_many(cls, totals):
+        """Add {(campaign_id, donor_key): (public_name, amount, count)}."""
+        increment_or_create_many(cls, [
+            (
+                {'campaign_id': campaign_id, 'donor_key': donor_key},
+                {'total_amount': amount, 'donation_count': count}, None, {'public_name': public_name},
+            )
+            for (campaign_id, donor_key), (public_name, amount, count) in totals.items()
+        ])
@@ -0,0 +1,83 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    CursorPagination that keeps every ordering field in the cursor instead of only the
+    first one. DRF filters on the first field and steps over rows that tie on it with
+    an offset; here the next page filters on the whole (first, ..., id) tuple, so ties
+    need no offset and every page is one range scan of the matching index.
+    `ordering` must end in a unique field and use one direction throughout.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        cursor = super().decode_cursor(request)
+        self.keyset_position = cursor.position if cursor else None
+        if self.keyset_position is not None:
+            ordering = self.get_ordering(request, queryset, view)
+            queryset = queryset.filter(self.after_position(queryset.model, ordering, cursor))
+
+        # The base class sees a cursor without a position (see decode_cursor)
+        page = super().paginate_queryset(queryset, request, view)
+        if page is None or self.keyset_position is None:
+            return page
+        self.cursor = cursor
+        if cursor.reverse:
+            self.has_next, self.next_position = True, cursor.position
+        else:
+            self.has_previous, self.previous_position = True, cursor.position
+        if self.template is not None:
+            self.display_page_controls = True
+        return page
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        return cursor._replace(position=None) if cursor else None
+
+    def after_position(self, model, ordering, cursor):
+        """Rows past the cursor: (f1, ..., fn) beyond its values in the page's direction."""
+        fields = [order.lstrip('-') for order in ordering]
+        try:
+            raw = json.loads(cursor.position)
+            values = [model._meta.get_field(name).to_python(value) for name, value in zip(fields, raw, strict=True)]
+        except (ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        op = 'lt' if cursor.reverse != ordering[0].startswith('-') else 'gt'
+        after = Q(**{f'{fields[-1]}__{op}': values[-1]})
+        for name, value in zip(reversed(fields[:-1]), reversed(values[:-1])):
+            after = Q(**{f'{name}__{op}': value}) | (Q(**{name: value}) & after)
+        # The redundant bound on the first field keeps the scan to a single index range
+        return Q(**{f'{fields[0]}__{op}e': values[0]}) & after
+
+    def _get_position_from_instance(self, instance, ordering):
+        return json.dumps([str(getattr(instance, order.lstrip('-'))) for order in ordering])
+
+
+class DonationCursorPagination(KeysetCursorPagination):
+    """Newest donations first, keyed on (donated_at, id)."""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-donated_at', '-id')
+
+
+class DonorTotalCursorPagination(KeysetCursorPagination):
+    """Top donors first; ?page_size=N gives a top-N list, `next` continues from there."""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-total_amount', '-id')
+
+
+class CampaignCursorPagination(KeysetCursorPagination):
+    """Newest campaigns first; with ?is_active= this walks the (is_active, -created_at) index."""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
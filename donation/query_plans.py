@@ -0,0 +1,90 @@
+# donation/query_plans.py
+
+import re
+from contextlib import contextmanager
+
+from django.db import connection
+
+# Tables whose reads must be served by an index; tiny fixed-size tables (TotalDonation shards) are left out
+HOT_TABLES = (
+    'donation_donation',
+    'donation_donationdailyrollup',
+    'donation_donortotal',
+    'donation_leaderboardentry',
+)
+
+# Columns with a handful of values: an equality on one of them alone still selects most of the table
+LOW_SELECTIVITY_COLUMNS = ('payment_status',)
+
+
+@contextmanager
+def capture_selects():
+    """Collect (sql, params) for every SELECT run on the default connection inside the block."""
+    statements = []
+
+    def wrapper(execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT'):
+            statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield statements
+
+
+def explain(sql, params):
+    """Plan lines for one statement on SQLite or PostgreSQL."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Small test tables make a sequential scan look cheapest; ask whether an index *can* serve it
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql, params)
+            return [row[0] for row in cursor.fetchall()]
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(plan, tables=HOT_TABLES, limited=False):
+    """
+    Plan lines that read every row of one of `tables`: a table scan always, and a walk of
+    a whole index unless the statement is `limited` (an ordered walk that stops after a page).
+    An unlimited index search constrained only by a LOW_SELECTIVITY_COLUMNS equality (e.g.
+    SUM over every completed donation) counts too: it touches nearly every row.
+    """
+    names = '|'.join(re.escape(table) for table in tables)
+    columns = '|'.join(re.escape(column) for column in LOW_SELECTIVITY_COLUMNS)
+    if connection.vendor == 'postgresql':
+        problems = [line for line in plan if re.search(rf'Seq Scan on ({names})\b', line)]
+        if not limited:
+            # An index node with no "Index Cond" below it, or only a low-selectivity one, visits (nearly) the whole index
+            for i, line in enumerate(plan):
+                if not re.search(rf'Index (Only )?Scan (Backward )?using \S+ on ({names})\b', line):
+                    continue
+                depth = len(line) - len(line.lstrip(' ->'))
+                details = []
+                for child in plan[i + 1:]:
+                    if len(child) - len(child.lstrip(' ->')) <= depth or child.lstrip().startswith('->'):
+                        break
+                    details.append(child)
+                conditions = [detail for detail in details if 'Index Cond' in detail]
+                if not conditions or all(
+                    re.fullmatch(rf"\s*Index Cond: \(\(?({columns})\)?(::text)? = '[^']*'(::text)?\)", c) for c in conditions
+                ):
+                    problems.append(line)
+        return problems
+
+    # SQLite: "SCAN t" reads the table, "SCAN t USING [COVERING] INDEX i" walks all of index i,
+    # "SEARCH t USING INDEX i (col=?)" is a range lookup, too wide if col is low-selectivity and nothing limits it
+    pattern = rf'^SCAN ({names})\b' + (r'(?!.*USING (COVERING )?INDEX)' if limited else '')
+    if not limited:
+        pattern += rf'|^SEARCH ({names}) USING (COVERING )?INDEX \S+ \(({columns})=\?\)$'
+    return [line for line in plan if re.search(pattern, line.strip())]
+
+
+def audit(statements, tables=HOT_TABLES):
+    """[(sql, offending plan lines)] for every captured statement that full-scans a hot table."""
+    problems = []
+    for sql, params in statements:
+        lines = full_scans(explain(sql, params), tables, limited=bool(re.search(r'\bLIMIT\b', sql)))
+        if lines:
+            problems.append((sql, lines))
+    return problems
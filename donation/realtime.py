@@ -0,0 +1,110 @@
+# donation/realtime.py
+
+import logging
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+ALL_CAMPAIGNS_GROUP = 'campaigns'
+
+
+def campaign_group(campaign_id):
+    return f'campaign_{campaign_id}'
+
+
+def progress_delta(campaign_id):
+    from .models import DonationCampaign
+
+    row = DonationCampaign.objects.filter(id=campaign_id).values('raised_amount', 'supporters', 'goal_amount').first()
+    if row is None:
+        return None
+    progress = round(row['raised_amount'] / row['goal_amount'] * 100, 2) if row['goal_amount'] > 0 else 0.0
+    return {
+        'campaign': campaign_id,
+        'raised_amount': str(row['raised_amount']),
+        'supporters': row['supporters'],
+        'progress': float(progress),
+    }
+
+
+def push_progress(campaign_id):
+    channel_layer = get_channel_layer()
+    delta = progress_delta(campaign_id)
+    if channel_layer is None or delta is None:
+        return
+    message = {'type': 'campaign.progress', 'data': delta}
+    for group in (campaign_group(campaign_id), ALL_CAMPAIGNS_GROUP):
+        async_to_sync(channel_layer.group_send)(group, message)
+
+
+class ProgressCoalescer:
+    """
+    Sends at most one progress update per campaign every `interval` seconds.
+    The first donation in a quiet period is pushed at once; later ones inside the
+    window collapse into a single trailing push that reads the state at send time.
+    Coalescing is per process, and the trailing pushes run on daemon timers, so a
+    worker about to exit must flush() them or they are lost.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._last_sent = {}
+        self._timers = {}
+
+    def notify(self, campaign_id):
+        with self._lock:
+            if campaign_id in self._timers:
+                return
+            wait = self._last_sent.get(campaign_id, 0) + self.interval - time.monotonic()
+            if wait > 0:
+                timer = threading.Timer(wait, self._trailing_push, args=(campaign_id,))
+                timer.daemon = True
+                self._timers[campaign_id] = timer
+                timer.start()
+                return
+            self._last_sent[campaign_id] = time.monotonic()
+        self._push(campaign_id)
+
+    def flush(self):
+        """Send every pending trailing push now instead of when its timer fires."""
+        with self._lock:
+            pending, self._timers = self._timers, {}
+            for campaign_id, timer in pending.items():
+                timer.cancel()
+                self._last_sent[campaign_id] = time.monotonic()
+        for campaign_id in pending:
+            self._push(campaign_id)
+
+    def _trailing_push(self, campaign_id):
+        with self._lock:
+            if self._timers.pop(campaign_id, None) is None:
+                return  # already sent by flush()
+            self._last_sent[campaign_id] = time.monotonic()
+        try:
+            self._push(campaign_id)
+        finally:
+            close_old_connections()
+
+    def _push(self, campaign_id):
+        try:
+            push_progress(campaign_id)
+        except Exception:
+            logger.exception("Campaign progress push failed for campaign %s", campaign_id)
+
+
+coalescer = ProgressCoalescer(settings.CAMPAIGN_PROGRESS_PUSH_INTERVAL)
+
+
+def notify_campaign_progress(campaign_id):
+    coalescer.notify(campaign_id)
+
+
+def flush_campaign_progress():
+    coalescer.flush()
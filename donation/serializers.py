@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Donation, TotalDonation, DonationCampaign
+from main.thumbnails import variant_urls
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -12,6 +13,8 @@ User = get_user_model()
 class DonationCampaignSerializer(serializers.ModelSerializer):
     progress_percentage = serializers.SerializerMethodField()
     raised_display = serializers.SerializerMethodField()
+    thumbnail_variants = serializers.SerializerMethodField()
+    average_rating = serializers.SerializerMethodField()
     class Meta:
         model = DonationCampaign
         fields = [
@@ -23,12 +26,16 @@ class DonationCampaignSerializer(serializers.ModelSerializer):
             'raised_amount',
             'supporters',
             'thumbnail',
+            'thumbnail_variants',
             'is_active',
             'created_at',
             'progress_percentage',
             'raised_display',
+            'average_rating',
+            'rating_count',
         ]
 
+    # Both read the `progress` annotation when the queryset comes from with_progress()
     def get_progress_percentage(self, obj):
         return obj.progress_percentage()
     
@@ -36,6 +43,12 @@ class DonationCampaignSerializer(serializers.ModelSerializer):
         percentage = obj.progress_percentage()
         return f"${obj.raised_amount} ({percentage}%)"
 
+    def get_average_rating(self, obj):
+        return obj.average_rating()
+
+    def get_thumbnail_variants(self, obj):
+        return variant_urls(obj.thumbnail_variants, self.context.get('request'))
+
 
 class CreateDonationCampaignSerializer(serializers.ModelSerializer):
     class Meta:
@@ -111,16 +124,30 @@ class UserDonationSummarySerializer(serializers.Serializer):
 
 
 class PerUserDonationSerializer(serializers.Serializer):
-    user_id = serializers.IntegerField()
-    user_email = serializers.EmailField()
-    user_total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    user_id = serializers.IntegerField(allow_null=True)
+    user_identifier = serializers.CharField()
+    user_total = serializers.DecimalField(max_digits=15, decimal_places=2)
+    donation_count = serializers.IntegerField()
 
 
 class AdminDonationSummarySerializer(serializers.Serializer):
     total_all_users = serializers.DecimalField(max_digits=15, decimal_places=2)
+    next = serializers.CharField(allow_null=True)
     per_user_donations = PerUserDonationSerializer(many=True)
 
 
+class LeaderboardQuerySerializer(serializers.Serializer):
+    campaign = serializers.IntegerField(required=False)
+    limit = serializers.IntegerField(required=False, default=10, min_value=1, max_value=100)
+
+
+class LeaderboardEntrySerializer(serializers.Serializer):
+    rank = serializers.IntegerField()
+    name = serializers.CharField(source='public_name')
+    total_amount = serializers.DecimalField(max_digits=15, decimal_places=2)
+    donation_count = serializers.IntegerField()
+
+
 class TotalDonationSerializer(serializers.ModelSerializer):
     class Meta:
         model = TotalDonation
@@ -130,3 +157,25 @@ class TotalDonationSerializer(serializers.ModelSerializer):
 class RateDonationInputSerializer(serializers.Serializer):
     donation_id = serializers.IntegerField()
     rating = serializers.IntegerField(min_value=1, max_value=5)
+
+
+class BulkRateDonationSerializer(serializers.Serializer):
+    ratings = RateDonationInputSerializer(many=True, allow_empty=False, max_length=500)
+
+
+class DonationListQuerySerializer(serializers.Serializer):
+    campaign = serializers.IntegerField(required=False)
+    payment_status = serializers.ChoiceField(choices=Donation.PAYMENT_STATUSES, required=False)
+
+
+class DonationGraphQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    granularity = serializers.ChoiceField(choices=['day', 'week', 'month', 'year'], default='day')
+    campaign = serializers.IntegerField(required=False)
+
+
+
+class CampaignListQuerySerializer(serializers.Serializer):
+    is_active = serializers.BooleanField(required=False, allow_null=True, default=None)
+    search = serializers.CharField(required=False, allow_blank=True, max_length=200)
@@ -0,0 +1,146 @@
+# donation/stripe_client.py
+
+import threading
+import time
+from collections import deque
+
+import requests
+import stripe
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+class StripeLatencyStats:
+    """Per-process latency and outcome counters for outgoing Stripe calls."""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._latencies.clear()
+            self.requests = 0
+            self.errors = 0
+            self.retries = 0
+            self.retries_denied = 0
+
+    def record(self, seconds, failed=False):
+        with self._lock:
+            self._latencies.append(seconds)
+            self.requests += 1
+            self.errors += int(failed)
+
+    def record_retry(self, allowed):
+        with self._lock:
+            if allowed:
+                self.retries += 1
+            else:
+                self.retries_denied += 1
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            counters = {
+                'requests': self.requests,
+                'errors': self.errors,
+                'retries': self.retries,
+                'retries_denied': self.retries_denied,
+            }
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+
+        return {
+            **counters,
+            'window': len(latencies),
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+        }
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of recent traffic: every request deposits `ratio`
+    tokens (up to `capacity`) and every retry spends one. When Stripe is down,
+    retries stop multiplying the load after the budget is spent.
+    """
+
+    def __init__(self, ratio, capacity):
+        self.ratio = ratio
+        self.capacity = capacity
+        self._tokens = capacity
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class PooledStripeClient(stripe.RequestsClient):
+    """
+    One requests.Session shared by every thread, so keep-alive connections to
+    Stripe are reused instead of being set up per call, with (connect, read)
+    timeouts and a retry budget on top of Stripe's own retry policy.
+    """
+
+    def __init__(self, connect_timeout, read_timeout, pool_size, retry_budget, stats):
+        session = requests.Session()
+        # Stripe's client owns retries; urllib3 must not retry underneath it
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        super().__init__(timeout=(connect_timeout, read_timeout), session=session)
+        self.retry_budget = retry_budget
+        self.stats = stats
+
+    def request(self, method, url, headers, post_data=None):
+        self.retry_budget.deposit()
+        started = time.perf_counter()
+        try:
+            response = super().request(method, url, headers, post_data)
+        except stripe.error.APIConnectionError:
+            self.stats.record(time.perf_counter() - started, failed=True)
+            raise
+        self.stats.record(time.perf_counter() - started, failed=response[1] >= 500)
+        return response
+
+    def _should_retry(self, response, api_connection_error, num_retries, max_network_retries):
+        if not super()._should_retry(response, api_connection_error, num_retries, max_network_retries):
+            return False
+        allowed = self.retry_budget.withdraw()
+        self.stats.record_retry(allowed)
+        return allowed
+
+
+stripe_stats = StripeLatencyStats()
+
+
+def build_client():
+    return PooledStripeClient(
+        connect_timeout=settings.STRIPE_CONNECT_TIMEOUT,
+        read_timeout=settings.STRIPE_READ_TIMEOUT,
+        pool_size=settings.STRIPE_POOL_SIZE,
+        retry_budget=RetryBudget(settings.STRIPE_RETRY_BUDGET_RATIO, capacity=10),
+        stats=stripe_stats,
+    )
+
+
+def configure_stripe():
+    """Point the global stripe module at the pooled client. Called once from DonationConfig.ready()."""
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    stripe.api_base = settings.STRIPE_API_BASE
+    stripe.max_network_retries = settings.STRIPE_MAX_NETWORK_RETRIES
+    stripe.default_http_client = build_client()
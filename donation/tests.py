@@ -1,3 +1,820 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import io
+import json
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import stripe
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from subscription.models import StripeEvent
+from subscription.stripe_events import drain_inbox
+from users.models import User
+from .cache import DONATIONS_TAG, invalidate_tag
+from .checks import check_shared_channel_layer
+from .models import Donation, DonationCampaign, DonationDailyRollup, DonorTotal, LeaderboardEntry, TotalDonation
+from .fake_stripe import start_fake_stripe
+from .query_plans import audit, capture_selects
+from .realtime import ProgressCoalescer, campaign_group
+from .stripe_client import RetryBudget, StripeLatencyStats, build_client
+
+
+def make_campaign(**kwargs):
+    defaults = {
+        'title': 'Clean water',
+        'organization': 'Wells for All',
+        'description': 'Drill wells.',
+        'goal_amount': Decimal('1000.00'),
+    }
+    defaults.update(kwargs)
+    return DonationCampaign.objects.create(**defaults)
+
+
+def checkout_completed_event(transaction_id, campaign, amount_cents):
+    return {
+        'id': f'evt_{transaction_id}',
+        'type': 'checkout.session.completed',
+        'data': {'object': {
+            'id': transaction_id,
+            'amount_total': amount_cents,
+            'currency': 'usd',
+            'metadata': {
+                'donation': 'true',
+                'campaign_id': str(campaign.id),
+                'donor_name': 'Guest',
+                'donor_email': 'guest@example.com',
+            },
+        }},
+    }
+
+
+class DonationTotalsTests(TestCase):
+
+    def test_completed_donation_updates_campaign_and_global_totals(self):
+        campaign = make_campaign()
+        Donation.objects.create(campaign=campaign, amount=Decimal('25.50'), payment_status='completed')
+
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.raised_amount, Decimal('25.50'))
+        self.assertEqual(campaign.supporters, 1)
+        self.assertEqual(TotalDonation.totals(), {'total_amount': Decimal('25.50'), 'total_count': 1})
+
+    def test_pending_donation_and_resave_do_not_count(self):
+        campaign = make_campaign()
+        Donation.objects.create(campaign=campaign, amount=Decimal('10.00'))
+        donation = Donation.objects.create(campaign=campaign, amount=Decimal('5.00'), payment_status='completed')
+        donation.rating = 5
+        donation.save()
+
+        campaign.refresh_from_db()
+        self.assertEqual((campaign.raised_amount, campaign.supporters), (Decimal('5.00'), 1))
+
+    def test_donation_without_campaign_counts_globally(self):
+        Donation.objects.create(amount=Decimal('7.00'), payment_status='completed')
+        self.assertEqual(TotalDonation.totals()['total_count'], 1)
+
+    def test_webhook_counts_donation_once(self):
+        campaign = make_campaign()
+        event = checkout_completed_event('cs_test_once', campaign, 4200)
+
+        with mock.patch('stripe.Webhook.construct_event', return_value=event):
+            response = self.client.post(reverse('stripe-webhook'), data=event, content_type='application/json')
+        drain_inbox()
+
+        self.assertEqual(response.status_code, 200)
+        campaign.refresh_from_db()
+        self.assertEqual((campaign.raised_amount, campaign.supporters), (Decimal('42.00'), 1))
+        self.assertEqual(TotalDonation.totals(), {'total_amount': Decimal('42.00'), 'total_count': 1})
+
+
+    def test_batch_applies_the_same_totals_as_save(self):
+        campaign = make_campaign()
+        user = User.objects.create_user(email='batch@example.com', password='x', first_name='Ada', last_name='Berg')
+        fields = [
+            {'user': user, 'campaign': campaign, 'amount': Decimal('10.00')},
+            {'donor_email': 'guest@example.com', 'campaign': campaign, 'amount': Decimal('4.00')},
+            {'user': user, 'amount': Decimal('1.50')},
+        ]
+        Donation.objects.create(payment_status='completed', **fields[0])
+
+        def snapshot():
+            campaign.refresh_from_db()
+            return (
+                (campaign.raised_amount, campaign.supporters), TotalDonation.totals(),
+                sorted(DonorTotal.objects.values_list('donor_key', 'total_amount', 'donation_count')),
+                sorted(LeaderboardEntry.objects.values_list('campaign_id', 'donor_key', 'total_amount'), key=str),
+                DonationDailyRollup.objects.aggregate(Sum('total_amount'), Sum('donation_count')),
+            )
+
+        with transaction.atomic():
+            for f in fields:
+                Donation.objects.create(payment_status='completed', **f)
+            expected = snapshot()
+            transaction.set_rollback(True)
+        rows = Donation.objects.bulk_create([Donation(payment_status='completed', **f) for f in fields])
+        Donation.apply_completed(rows)
+
+        self.assertEqual(snapshot(), expected)
+
+
+class TotalDonationShardTests(TestCase):
+
+    def test_totals_sum_all_shards(self):
+        TotalDonation.objects.create(id=1, total_amount=Decimal('10.00'), total_count=2)
+        TotalDonation.objects.create(id=5, total_amount=Decimal('2.50'), total_count=1)
+        TotalDonation.update_totals(Decimal('1.00'))
+
+        self.assertEqual(TotalDonation.totals(), {'total_amount': Decimal('13.50'), 'total_count': 4})
+
+    def test_compact_moves_everything_into_first_shard(self):
+        for amount in ('1.00', '2.00', '3.00', '4.00'):
+            TotalDonation.update_totals(Decimal(amount))
+        before = TotalDonation.totals()
+
+        TotalDonation.compact()
+
+        self.assertEqual(TotalDonation.totals(), before)
+        first = TotalDonation.objects.get(id=1)
+        self.assertEqual((first.total_amount, first.total_count), (Decimal('10.00'), 4))
+
+    def test_public_summary_sums_shards(self):
+        cache.clear()
+        TotalDonation.update_totals(Decimal('8.00'))
+        TotalDonation.update_totals(Decimal('2.00'))
+
+        response = self.client.get(reverse('public-donation-summary'))
+
+        self.assertEqual(response.json(), {'total_amount': '10.00', 'total_count': 2})
+
+
+class PublicStatsCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_repeat_requests_are_served_from_cache(self):
+        url = reverse('fund-collection')
+        self.client.get(url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.json(), {'fund_collection': 0.0})
+
+    def test_completed_donation_invalidates_after_commit(self):
+        url = reverse('public-donation-summary')
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Donation.objects.create(amount=Decimal('6.00'), payment_status='completed')
+
+        self.assertEqual(self.client.get(url).json(), {'total_amount': '6.00', 'total_count': 1})
+
+    def test_stale_entry_is_served_while_another_request_recomputes(self):
+        url = reverse('public-donation-summary')
+        self.client.get(url)
+        invalidate_tag(DONATIONS_TAG)
+        TotalDonation.update_totals(Decimal('1.00'))
+
+        # Simulate a recompute already in flight elsewhere
+        with mock.patch.object(cache, 'add', return_value=False), self.assertNumQueries(0):
+            response = self.client.get(url)
+
+        self.assertEqual(response.json(), {'total_amount': '0.00', 'total_count': 0})
+        self.assertEqual(self.client.get(url).json(), {'total_amount': '1.00', 'total_count': 1})
+
+    def test_key_uses_validated_params_only(self):
+        url = reverse('donation-graph')
+        self.client.get(url, {'granularity': 'month', 'utm_source': 'a'})
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'utm_source': 'b', 'granularity': 'month', 'junk': 'x'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(url, {'granularity': 'hourly'}).status_code, 400)
+        self.assertEqual(len([key for key in cache._cache if 'publicstats' in key and 'lock' not in key]), 1)
+
+    def test_deploy_check_requires_a_shared_channel_layer(self):
+        self.assertEqual([error.id for error in check_shared_channel_layer(None)], ['donation.E002'])
+        redis = {'default': {'BACKEND': 'channels_redis.core.RedisChannelLayer', 'CONFIG': {'hosts': ['redis://cache:6379/0']}}}
+        with override_settings(CHANNEL_LAYERS=redis):
+            self.assertEqual(check_shared_channel_layer(None), [])
+
+
+class DonationRollupTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_completed_donations_roll_up_per_day_and_campaign(self):
+        campaign = make_campaign()
+        Donation.objects.create(campaign=campaign, amount=Decimal('10.00'), payment_status='completed')
+        Donation.objects.create(campaign=campaign, amount=Decimal('2.50'), payment_status='completed')
+        Donation.objects.create(amount=Decimal('4.00'), payment_status='completed')
+        Donation.objects.create(campaign=campaign, amount=Decimal('99.00'))
+
+        today = timezone.localdate()
+
+        def day_total(campaign):
+            return DonationDailyRollup.objects.filter(date=today, campaign=campaign).aggregate(
+                amount=Sum('total_amount'), count=Sum('donation_count'),
+            )
+
+        self.assertEqual(day_total(campaign), {'amount': Decimal('12.50'), 'count': 2})
+        self.assertEqual(day_total(None), {'amount': Decimal('4.00'), 'count': 1})
+
+    @override_settings(DONATION_ROLLUP_SHARDS=4)
+    def test_same_day_donations_spread_over_shards(self):
+        campaign = make_campaign()
+        with mock.patch('donation.models.random.randrange', side_effect=[2, 3, 2]) as randrange:
+            for amount in ('1.00', '2.00', '4.00'):
+                Donation.objects.create(campaign=campaign, amount=Decimal(amount), payment_status='completed')
+
+        randrange.assert_called_with(4)
+        self.assertEqual(
+            list(DonationDailyRollup.objects.order_by('shard').values_list('shard', 'total_amount', 'donation_count')),
+            [(2, Decimal('5.00'), 2), (3, Decimal('2.00'), 1)],
+        )
+
+    def test_backfill_rebuilds_rollup_from_donations(self):
+        campaign = make_campaign()
+        donation = Donation.objects.create(campaign=campaign, amount=Decimal('10.00'), payment_status='completed')
+        Donation.objects.filter(id=donation.id).update(donated_at=timezone.now() - datetime.timedelta(days=40))
+        Donation.objects.create(campaign=campaign, amount=Decimal('3.00'), payment_status='completed')
+        DonationDailyRollup.objects.all().delete()
+
+        call_command('backfill_donation_rollup', stdout=io.StringIO())
+
+        self.assertEqual(DonationDailyRollup.objects.count(), 2)
+        self.assertEqual(
+            DonationDailyRollup.objects.aggregate(total=Sum('total_amount'))['total'], Decimal('13.00')
+        )
+
+    def test_graph_endpoint_buckets_by_granularity(self):
+        campaign = make_campaign()
+        DonationDailyRollup.objects.create(date=datetime.date(2025, 1, 30), campaign=campaign, total_amount=5, donation_count=1)
+        DonationDailyRollup.objects.create(date=datetime.date(2025, 2, 2), campaign=campaign, total_amount=7, donation_count=2)
+        DonationDailyRollup.objects.create(date=datetime.date(2025, 2, 3), campaign=None, total_amount=1, donation_count=1)
+
+        response = self.client.get(reverse('donation-graph'), {
+            'start': '2025-01-01', 'end': '2025-03-31', 'granularity': 'month',
+        })
+
+        self.assertEqual(response.json(), [
+            {'period': '2025-01-01', 'total_amount': 5.0, 'count': 1},
+            {'period': '2025-02-01', 'total_amount': 8.0, 'count': 3},
+        ])
+
+        response = self.client.get(reverse('donation-graph'), {
+            'start': '2025-01-01', 'end': '2025-03-31', 'granularity': 'week', 'campaign': campaign.id,
+        })
+        self.assertEqual(response.json(), [
+            {'period': '2025-01-27', 'total_amount': 12.0, 'count': 3},
+        ])
+
+
+class DonationListTests(TestCase):
+
+    def setUp(self):
+        campaigns = [make_campaign(title=f'Campaign {i}') for i in range(3)]
+        for i in range(12):
+            user = User.objects.create(email=f'donor{i}@example.com')
+            Donation.objects.create(
+                user=user, campaign=campaigns[i % 3], amount=Decimal('1.00'),
+                payment_status='completed' if i % 2 else 'pending',
+            )
+        self.campaign = campaigns[0]
+
+    def test_list_page_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('donation-list'), {'page_size': 10})
+
+        body = response.json()
+        self.assertEqual(len(body['results']), 10)
+        self.assertTrue(all(row['user_email'] and row['campaign_title'] for row in body['results']))
+
+    def test_cursor_walks_every_donation_once(self):
+        seen = []
+        url, params = reverse('donation-list'), {'page_size': 5}
+        while url:
+            body = self.client.get(url, params).json()
+            seen += [row['id'] for row in body['results']]
+            url, params = body['next'], None
+
+        self.assertEqual(sorted(seen), sorted(Donation.objects.values_list('id', flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_cursor_pages_through_tied_timestamps_without_offsets(self):
+        # Replayed donations are dated by one-second Stripe event timestamps
+        Donation.objects.update(donated_at=timezone.now().replace(microsecond=0))
+        seen, url, params = [], reverse('donation-list'), {'page_size': 5}
+        with CaptureQueriesContext(connection) as queries:
+            while url:
+                body = self.client.get(url, params).json()
+                seen.append([row['id'] for row in body['results']])
+                url, params = body['next'], None
+
+        self.assertEqual(sum(seen, []), list(Donation.objects.order_by('-id').values_list('id', flat=True)))
+        self.assertFalse(any('OFFSET' in query['sql'] for query in queries.captured_queries))
+        back = self.client.get(body['previous']).json()
+        self.assertEqual([row['id'] for row in back['results']], seen[-2])
+
+    def test_filters_by_campaign_and_status(self):
+        response = self.client.get(reverse('donation-list'), {
+            'campaign': self.campaign.id, 'payment_status': 'completed',
+        })
+
+        expected = Donation.objects.filter(campaign=self.campaign, payment_status='completed')
+        self.assertEqual(
+            {row['id'] for row in response.json()['results']}, set(expected.values_list('id', flat=True))
+        )
+
+    def test_invalid_filters_are_rejected(self):
+        for params in ({'campaign': 'abc'}, {'payment_status': 'refunded'}):
+            response = self.client.get(reverse('donation-list'), params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(next(iter(params)), response.json())
+
+
+class DonationExportTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create(email='admin@example.com', is_staff=True)
+        campaign = make_campaign()
+        Donation.objects.create(campaign=campaign, user=self.admin, amount=Decimal('3.00'), payment_status='completed')
+        Donation.objects.create(amount=Decimal('4.00'), transaction_id='cs_guest')
+
+    def test_csv_export_streams_header_and_rows(self):
+        self.client.force_login(self.admin)
+
+        response = self.client.get(reverse('donation-export', args=['csv']))
+
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'donated_at', 'amount'])
+        self.assertEqual(len(lines), 3)
+        self.assertIn('Clean water', lines[1])
+
+    def test_ndjson_export_filters_by_status(self):
+        self.client.force_login(self.admin)
+
+        response = self.client.get(reverse('donation-export', args=['ndjson']), {'payment_status': 'pending'})
+
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([(row['transaction_id'], row['campaign__title']) for row in rows], [('cs_guest', None)])
+
+    def test_invalid_campaign_filter_is_rejected(self):
+        self.client.force_login(self.admin)
+
+        response = self.client.get(reverse('donation-export', args=['csv']), {'campaign': 'abc'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_requires_admin(self):
+        response = self.client.get(reverse('donation-export', args=['csv']))
+        self.assertIn(response.status_code, (401, 403))
+
+
+class AdminDonationSummaryTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create(email='admin@example.com', is_staff=True)
+        donor = User.objects.create(email='donor@example.com')
+        Donation.objects.create(user=donor, amount=Decimal('5.00'), payment_status='completed')
+        Donation.objects.create(user=donor, amount=Decimal('7.00'), payment_status='completed')
+        Donation.objects.create(donor_name='Ann', donor_email='Ann@Example.com', amount=Decimal('20.00'), payment_status='completed')
+        Donation.objects.create(donor_name='Ann', donor_email='ann@example.com ', amount=Decimal('1.00'), payment_status='completed')
+        Donation.objects.create(amount=Decimal('3.00'), payment_status='completed')
+        Donation.objects.create(user=donor, amount=Decimal('50.00'))
+
+    def test_summary_pages_donors_by_total(self):
+        self.client.force_login(self.admin)
+
+        body = self.client.get(reverse('admin-donation-summary'), {'page_size': 2}).json()
+
+        self.assertEqual(body['total_all_users'], '36.00')
+        self.assertEqual(
+            [(row['user_identifier'], row['user_total'], row['donation_count']) for row in body['per_user_donations']],
+            [('Ann', '21.00', 2), ('donor@example.com', '12.00', 2)],
+        )
+        rest = self.client.get(body['next']).json()
+        self.assertEqual([row['user_identifier'] for row in rest['per_user_donations']], ['Guest'])
+        self.assertIsNone(rest['next'])
+
+    def test_backfill_matches_incremental_totals(self):
+        incremental = set(DonorTotal.objects.values_list('donor_key', 'total_amount', 'donation_count'))
+
+        call_command('backfill_donor_totals', stdout=io.StringIO())
+
+        self.assertEqual(set(DonorTotal.objects.values_list('donor_key', 'total_amount', 'donation_count')), incremental)
+
+    def test_backfill_folds_non_ascii_guests_like_save(self):
+        Donation.objects.create(donor_name='Zoë', donor_email='Zoë@Example.com', amount=Decimal('2.00'), payment_status='completed')
+        Donation.objects.create(donor_name='Zoë', donor_email='ZOË@example.com', amount=Decimal('3.00'), payment_status='completed')
+        incremental = set(DonorTotal.objects.values_list('donor_key', 'total_amount', 'donation_count'))
+
+        call_command('backfill_donor_totals', stdout=io.StringIO())
+
+        self.assertEqual(set(DonorTotal.objects.values_list('donor_key', 'total_amount', 'donation_count')), incremental)
+        self.assertEqual(DonorTotal.objects.get(donor_key='guest:zoë@example.com').donation_count, 2)
+
+
+class CheckoutIdempotencyTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.campaign = make_campaign()
+        self.payload = {'amount': '15.00', 'campaign_id': self.campaign.id, 'donor_email': 'guest@example.com'}
+
+    def post(self, payload, key):
+        return self.client.post(reverse('create-donation-session'), data=payload,
+                                content_type='application/json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_repeated_key_returns_cached_url_without_calling_stripe(self):
+        session = mock.Mock(url='https://checkout.stripe.test/cs_1')
+        with mock.patch('stripe.checkout.Session.create', return_value=session) as create:
+            first = self.post(self.payload, 'retry-1')
+            second = self.post(self.payload, 'retry-1')
+
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(second.json()['checkout_url'], session.url)
+        create.assert_called_once()
+        self.assertIn('idempotency_key', create.call_args.kwargs)
+
+    def test_reusing_key_with_different_payload_is_rejected(self):
+        session = mock.Mock(url='https://checkout.stripe.test/cs_2')
+        with mock.patch('stripe.checkout.Session.create', return_value=session) as create:
+            self.post(self.payload, 'retry-2')
+            response = self.post(dict(self.payload, amount='99.00'), 'retry-2')
+
+        self.assertEqual(response.status_code, 400)
+        create.assert_called_once()
+
+
+class PooledStripeClientTests(TestCase):
+
+    def setUp(self):
+        self.server = start_fake_stripe()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def test_sessions_reuse_one_keep_alive_connection(self):
+        client = build_client()
+        client.stats = StripeLatencyStats()
+        with mock.patch('stripe.default_http_client', client), mock.patch('stripe.api_base', self.server.api_base):
+            urls = [stripe.checkout.Session.create(mode='payment').url for _ in range(5)]
+
+        self.assertEqual(len(set(urls)), 5)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(client.stats.snapshot()['requests'], 5)
+
+    def test_retry_budget_stops_retries_once_spent(self):
+        budget = RetryBudget(ratio=0.5, capacity=1)
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+
+
+class CampaignListTests(TestCase):
+
+    def setUp(self):
+        make_campaign(title='Clean water', goal_amount=Decimal('200.00'), raised_amount=Decimal('50.00'))
+        make_campaign(title='School books', organization='Read On', description='Books for schools.')
+        make_campaign(title='Old drive', is_active=False, goal_amount=Decimal('0.00'))
+
+    def test_list_is_paginated_with_db_progress_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('campaign-list'), {'page_size': 2})
+
+        body = response.json()
+        self.assertEqual(len(body['results']), 2)
+        self.assertIsNotNone(body['next'])
+        water = self.client.get(reverse('campaign-list'), {'search': 'water'}).json()['results'][0]
+        self.assertEqual((water['progress_percentage'], water['raised_display']), (25.0, '$50.00 (25.00%)'))
+
+    def test_filters_by_is_active_and_searches_text(self):
+        inactive = self.client.get(reverse('campaign-list'), {'is_active': 'false'}).json()['results']
+        self.assertEqual([c['title'] for c in inactive], ['Old drive'])
+        self.assertEqual(inactive[0]['progress_percentage'], 0.0)
+
+        found = self.client.get(reverse('campaign-list'), {'search': 'schools read'}).json()['results']
+        self.assertEqual([c['title'] for c in found], ['School books'])
+        self.assertEqual(len(self.client.get(reverse('campaign-list')).json()['results']), 3)
+
+
+class ImageVariantTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = self.settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def upload(self, size=(1600, 900)):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'teal').save(buffer, 'PNG')
+        return SimpleUploadedFile('cover.png', buffer.getvalue(), content_type='image/png')
+
+    def test_upload_queues_content_addressed_variants(self):
+        with mock.patch('main.thumbnails.executor.submit', side_effect=lambda fn, *a: fn(*a)):
+            with self.captureOnCommitCallbacks(execute=True):
+                campaign = make_campaign(thumbnail=self.upload())
+            with self.captureOnCommitCallbacks(execute=True):
+                other = make_campaign(thumbnail=self.upload())
+
+        campaign.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(campaign.thumbnail_variants['sizes'], other.thumbnail_variants['sizes'])
+        small = campaign.thumbnail_variants['sizes']['small']
+        with default_storage.open(small['webp']) as fh:
+            self.assertEqual(Image.open(fh).size, (320, 180))
+
+        row = self.client.get(reverse('campaign-detail', args=[campaign.id])).json()
+        self.assertTrue(row['thumbnail_variants']['large']['jpeg'].endswith('/large.jpg'))
+
+    def test_job_renders_the_image_current_at_run_time(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            campaign = make_campaign(thumbnail=self.upload())
+        replaced = default_storage.save('campaigns/replaced.png', self.upload(size=(400, 400)))
+        DonationCampaign.objects.filter(id=campaign.id).update(thumbnail=replaced)
+        with mock.patch('main.thumbnails.executor.submit', side_effect=lambda fn, *a: fn(*a)):
+            for callback in callbacks:
+                callback()
+
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.thumbnail_variants['source'], replaced)
+        with default_storage.open(campaign.thumbnail_variants['sizes']['large']['jpeg']) as fh:
+            self.assertEqual(Image.open(fh).size, (400, 400))
+
+
+class LeaderboardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.water = make_campaign()
+        self.books = make_campaign(title='School books')
+        ada = User.objects.create(email='ada@example.com', first_name='Ada', last_name='L')
+        Donation.objects.create(user=ada, campaign=self.water, amount=Decimal('30.00'), payment_status='completed')
+        Donation.objects.create(user=ada, campaign=self.books, amount=Decimal('30.00'), payment_status='completed')
+        Donation.objects.create(donor_email='bob@example.com', campaign=self.water, amount=Decimal('50.00'),
+                                payment_status='completed')
+        Donation.objects.create(donor_name='Cy', amount=Decimal('5.00'), payment_status='completed')
+
+    def board(self, **params):
+        with self.assertNumQueries(1):
+            return self.client.get(reverse('donation-leaderboard'), params).json()['results']
+
+    def test_overall_and_campaign_boards_rank_by_total_without_emails(self):
+        self.assertEqual(
+            [(row['rank'], row['name'], row['total_amount']) for row in self.board()],
+            [(1, 'Ada L', '60.00'), (2, 'Anonymous', '50.00'), (3, 'Cy', '5.00')],
+        )
+        water = self.board(campaign=self.water.id, limit=1)
+        self.assertEqual([(row['name'], row['donation_count']) for row in water], [('Anonymous', 1)])
+
+    def test_backfill_matches_incremental_board(self):
+        before = set(LeaderboardEntry.objects.values_list('campaign_id', 'donor_key', 'public_name', 'total_amount', 'donation_count'))
+        call_command('backfill_leaderboard', stdout=io.StringIO())
+        after = set(LeaderboardEntry.objects.values_list('campaign_id', 'donor_key', 'public_name', 'total_amount', 'donation_count'))
+        self.assertEqual(before, after)
+
+    def test_backfill_folds_non_ascii_guests_like_save(self):
+        for email in ('Zoë@Example.com', 'ZOË@example.com'):
+            Donation.objects.create(donor_name='Zoë', donor_email=email, campaign=self.water, amount=Decimal('4.00'),
+                                    payment_status='completed')
+        self.test_backfill_matches_incremental_board()
+        self.assertEqual(
+            LeaderboardEntry.objects.get(campaign=self.water, donor_key='guest:zoë@example.com').donation_count, 2,
+        )
+
+
+class DonationRatingTests(TestCase):
+
+    def setUp(self):
+        self.campaign = make_campaign()
+        self.donations = [
+            Donation.objects.create(campaign=self.campaign, amount=Decimal('5.00'), payment_status='completed')
+            for _ in range(3)
+        ]
+
+    def test_single_rating_writes_only_the_rating_column(self):
+        response = self.client.post(reverse('rate-donation'), {'donation_id': self.donations[0].id, 'rating': 4})
+        donation = Donation.objects.only('id', 'campaign_id').get(id=self.donations[0].id)
+        with CaptureQueriesContext(connection) as queries:
+            donation.rate(2)
+
+        self.assertEqual(response.status_code, 200)
+        update = next(q['sql'] for q in queries if q['sql'].startswith('UPDATE "donation_donation" '))
+        self.assertNotIn('"amount"', update)
+        self.campaign.refresh_from_db()
+        self.assertEqual((self.campaign.rating_sum, self.campaign.rating_count), (2, 1))
+
+    def test_bulk_rating_updates_average_and_reports_missing(self):
+        first, second, third = self.donations
+        third.rate(5)
+        payload = {'ratings': [
+            {'donation_id': first.id, 'rating': 3},
+            {'donation_id': second.id, 'rating': 1},
+            {'donation_id': second.id, 'rating': 4},
+            {'donation_id': third.id, 'rating': 2},
+            {'donation_id': 999999, 'rating': 5},
+        ]}
+
+        response = self.client.post(reverse('bulk-rate-donation'), payload, content_type='application/json')
+
+        self.assertEqual(response.json(), {'updated': 3, 'missing': [999999]})
+        self.assertEqual(list(Donation.objects.order_by('id').values_list('rating', flat=True)), [3, 4, 2])
+        row = self.client.get(reverse('campaign-detail', args=[self.campaign.id])).json()
+        self.assertEqual((row['average_rating'], row['rating_count']), (3.0, 3))
+
+
+class DonationQueryPlanTests(TestCase):
+    """EXPLAIN every query the donation read endpoints run and fail on full scans of hot tables."""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create(email='admin@example.com', is_staff=True, is_superuser=True)
+        self.donor = User.objects.create(email='donor@example.com')
+        self.campaign = make_campaign()
+        for i in range(3):
+            Donation.objects.create(user=self.donor, campaign=self.campaign, amount=Decimal('4.00'),
+                                    payment_status='completed', transaction_id=f'cs_plan_{i}')
+
+    def assert_index_only_access(self, url, params=None, user=None):
+        if user is not None:
+            self.client.force_login(user)
+        with capture_selects() as statements:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200, url)
+        self.assertTrue(statements, url)
+        problems = audit(statements)
+        self.assertEqual(problems, [], f'{url} full-scans a hot table')
+
+    def test_donation_list_filters(self):
+        for params in ({}, {'campaign': self.campaign.id}, {'payment_status': 'completed'}):
+            self.assert_index_only_access(reverse('donation-list'), params)
+
+    def test_summaries_graphs_and_leaderboards(self):
+        self.assert_index_only_access(reverse('user-donation-summary'), user=self.donor)
+        self.assert_index_only_access(reverse('fund-collection'))
+        self.assert_index_only_access(reverse('donation-graph'), {'campaign': self.campaign.id})
+        self.assert_index_only_access(reverse('donation-leaderboard'), {'campaign': self.campaign.id})
+        self.assert_index_only_access(reverse('admin-donation-summary'), user=self.admin)
+
+    def test_audit_flags_a_table_scan(self):
+        with capture_selects() as statements:
+            list(Donation.objects.filter(message__contains='thanks'))
+        self.assertEqual(len(audit(statements)), 1)
+
+    def test_audit_flags_an_unbounded_aggregate_over_the_status_index(self):
+        with capture_selects() as statements:
+            Donation.objects.filter(payment_status='completed').aggregate(Sum('amount'))
+            list(Donation.objects.filter(payment_status='completed')[:10])
+        self.assertEqual([sql for sql, _ in audit(statements)], [statements[0][0]])
+
+
+class CampaignProgressPushTests(TestCase):
+
+    def test_completed_donation_pushes_delta_after_commit(self):
+        campaign = make_campaign(goal_amount=Decimal('200.00'))
+        layer = get_channel_layer()
+        async_to_sync(layer.group_add)(campaign_group(campaign.id), 'test-progress')
+
+        with mock.patch('donation.realtime.coalescer', ProgressCoalescer(interval=0)):
+            with self.captureOnCommitCallbacks(execute=True):
+                Donation.objects.create(campaign=campaign, amount=Decimal('50.00'), payment_status='completed')
+
+        message = async_to_sync(layer.receive)('test-progress')
+        self.assertEqual(message['data'], {
+            'campaign': campaign.id, 'raised_amount': '50.00', 'supporters': 1, 'progress': 25.0,
+        })
+
+    def test_inbox_worker_completion_reaches_the_campaign_group(self):
+        campaign = make_campaign(goal_amount=Decimal('200.00'))
+        event = checkout_completed_event('cs_test_push', campaign, 5000)
+        StripeEvent.objects.create(event_id=event['id'], type=event['type'], payload=event)
+        layer = get_channel_layer()
+        async_to_sync(layer.group_add)(campaign_group(campaign.id), 'test-progress')
+
+        with mock.patch('donation.realtime.coalescer', ProgressCoalescer(interval=0)):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(drain_inbox(), 1)
+
+        message = async_to_sync(layer.receive)('test-progress')
+        self.assertEqual(message['data'], {
+            'campaign': campaign.id, 'raised_amount': '50.00', 'supporters': 1, 'progress': 25.0,
+        })
+
+    def test_flush_sends_pending_trailing_push_once(self):
+        coalescer = ProgressCoalescer(interval=0.1)
+        with mock.patch('donation.realtime.push_progress') as push:
+            coalescer.notify(7)
+            coalescer.notify(7)
+            coalescer.flush()
+            self.assertEqual(push.call_count, 2)
+            time.sleep(0.3)
+        self.assertEqual(push.call_count, 2)
+
+    def test_burst_is_coalesced_into_leading_and_trailing_push(self):
+        coalescer = ProgressCoalescer(interval=0.1)
+        with mock.patch('donation.realtime.push_progress') as push:
+            for _ in range(20):
+                coalescer.notify(7)
+            self.assertEqual(push.call_count, 1)
+            time.sleep(0.3)
+        self.assertEqual(push.call_count, 2)
+
+
+class InboxProgressFlushTests(TransactionTestCase):
+
+    def test_one_shot_drain_sends_the_coalesced_trailing_push(self):
+        campaign = make_campaign(goal_amount=Decimal('200.00'))
+        for i in range(3):
+            event = checkout_completed_event(f'cs_test_flush_{i}', campaign, 1000)
+            StripeEvent.objects.create(event_id=event['id'], type=event['type'], payload=event)
+        layer = get_channel_layer()
+        async_to_sync(layer.group_add)(campaign_group(campaign.id), 'test-flush')
+
+        # The window outlives the drain, so only the flush can send the final state
+        with mock.patch('donation.realtime.coalescer', ProgressCoalescer(interval=60)):
+            drain_inbox()
+
+        async def receive():
+            return (await asyncio.wait_for(layer.receive('test-flush'), timeout=2))['data']
+
+        first, last = [async_to_sync(receive)() for _ in range(2)]
+        self.assertEqual((first['supporters'], last['supporters']), (1, 3))
+        self.assertEqual(last['raised_amount'], '30.00')
+
+
+def create_with_retry(attempts=200, **fields):
+    """
+    SQLite's shared in-memory test database rejects concurrent writers with
+    "table is locked" instead of waiting; the whole transaction is rolled back,
+    so retrying it is safe and still exercises the interleaving.
+    """
+    for _ in range(attempts):
+        try:
+            return Donation.objects.create(**fields)
+        except OperationalError as exc:
+            if 'locked' not in str(exc):
+                raise
+            time.sleep(0.005)
+    raise AssertionError('database stayed locked')
+
+
+class ConcurrentDonationTotalsTests(TransactionTestCase):
+    workers = 8
+    donations_per_worker = 10
+
+    # Progress pushes read the campaign row and would only add SQLite lock contention here
+    @mock.patch('donation.models.notify_campaign_progress')
+    def test_parallel_completions_do_not_lose_updates(self, notify):
+        campaign = make_campaign()
+        errors = []
+        start = threading.Barrier(self.workers)
+
+        def complete_donations(worker):
+            try:
+                start.wait()
+                for i in range(self.donations_per_worker):
+                    create_with_retry(
+                        campaign_id=campaign.id,
+                        amount=Decimal('1.25'),
+                        payment_status='completed',
+                        transaction_id=f'cs_{worker}_{i}',
+                    )
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=complete_donations, args=(w,)) for w in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        count = self.workers * self.donations_per_worker
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.supporters, count)
+        self.assertEqual(campaign.raised_amount, Decimal('1.25') * count)
+        self.assertEqual(TotalDonation.totals(), {'total_amount': Decimal('1.25') * count, 'total_count': count})
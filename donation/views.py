@@ -4,17 +4,20 @@ from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.generics import CreateAPIView
 from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
-from django.views.decorators.csrf import csrf_exempt
-from django.utils.decorators import method_decorator
 from django.db.models import Sum
-from django.conf import settings
 from django.contrib.auth import get_user_model
 import stripe
 import datetime
 import logging
-from django.db.models.functions import TruncMonth, TruncWeek
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek, TruncYear
 
-from .models import Donation, DonationCampaign, TotalDonation
+from main.exports import EXPORT_FORMATS, stream_export
+from main.idempotency import IdempotencyKeyError, create_checkout_url
+
+from .cache import cache_public_stats
+from .stripe_client import stripe_stats
+from .pagination import CampaignCursorPagination, DonationCursorPagination, DonorTotalCursorPagination
+from .models import Donation, DonationCampaign, DonationDailyRollup, DonorTotal, LeaderboardEntry, TotalDonation
 from .serializers import (
     DonationSerializer,
     DonationCampaignSerializer,
@@ -25,11 +28,16 @@ from .serializers import (
     AdminDonationSummarySerializer,
     TotalDonationSerializer,
     RateDonationInputSerializer,
+    BulkRateDonationSerializer,
+    DonationGraphQuerySerializer,
+    DonationListQuerySerializer,
+    CampaignListQuerySerializer,
+    LeaderboardQuerySerializer,
+    LeaderboardEntrySerializer,
 )
 
 
 User = get_user_model()
-stripe.api_key = settings.STRIPE_SECRET_KEY
 logger = logging.getLogger(__name__)
 
 
@@ -45,10 +53,10 @@ class FundCollectionView(APIView):
     """
     permission_classes = [AllowAny]
 
+    @cache_public_stats()
     def get(self, request):
-        total_amount = Donation.objects.filter(payment_status='completed').aggregate(
-            total=Sum('amount')
-        )['total'] or 0.0
+        # Sum of all counter shards, like the public summary
+        total_amount = TotalDonation.totals()['total_amount']
 
         return Response({
             'fund_collection': round(total_amount, 2)
@@ -60,8 +68,21 @@ class DonationCampaignViewSet(viewsets.ModelViewSet):
     A ViewSet for managing Donation Campaigns.
     Admins can create, update, and delete campaigns.
     Any user can list and retrieve campaigns.
+    Lists are cursor-paginated and accept ?is_active=true|false and ?search=<words>;
+    progress is computed by the database.
     """
-    queryset = DonationCampaign.objects.all().order_by('-created_at')
+    queryset = DonationCampaign.objects.with_progress()
+    pagination_class = CampaignCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = CampaignListQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        if params.validated_data.get('is_active') is not None:
+            queryset = queryset.filter(is_active=params.validated_data['is_active'])
+        if params.validated_data.get('search'):
+            queryset = queryset.search(params.validated_data['search'])
+        return queryset
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -87,9 +108,21 @@ class DonationViewSet(mixins.ListModelMixin,
     Admins can access all donation details.
     Any user can list and retrieve donations.
     Includes a custom action to rate a donation.
+    Lists are cursor-paginated and can be filtered with ?campaign=<id>&payment_status=<status>.
     """
-    queryset = Donation.objects.all()
+    queryset = Donation.objects.select_related('user', 'campaign')
     serializer_class = DonationSerializer
+    pagination_class = DonationCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = DonationListQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        if params.validated_data.get('campaign'):
+            queryset = queryset.filter(campaign_id=params.validated_data['campaign'])
+        if params.validated_data.get('payment_status'):
+            queryset = queryset.filter(payment_status=params.validated_data['payment_status'])
+        return queryset
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve', 'rate_donation']:
@@ -104,11 +137,44 @@ class DonationViewSet(mixins.ListModelMixin,
         donation = self.get_object()
         serializer = RateDonationSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        donation.rating = serializer.validated_data['rating']
-        donation.save()
+        donation.rate(serializer.validated_data['rating'])
         return Response({"detail": "Thank you for your rating!"}, status=status.HTTP_200_OK)
 
 
+class DonationExportView(APIView):
+    """
+    API view for administrators to download every donation as CSV or NDJSON.
+    Streams from a server-side cursor, optionally filtered by campaign and payment_status.
+    """
+    permission_classes = [IsAdminUser]
+
+    COLUMNS = [
+        'id', 'donated_at', 'amount', 'currency', 'payment_status', 'campaign_id', 'campaign__title',
+        'user_id', 'user__email', 'donor_name', 'donor_email', 'transaction_id', 'rating', 'is_request',
+    ]
+
+    def get(self, request, export_format):
+        if export_format not in EXPORT_FORMATS:
+            return Response({'error': 'Unsupported export format'}, status=status.HTTP_404_NOT_FOUND)
+
+        donations = (
+            Donation.objects.select_related('user', 'campaign')
+            .only(
+                'id', 'donated_at', 'amount', 'currency', 'payment_status', 'campaign', 'campaign__title',
+                'user', 'user__email', 'donor_name', 'donor_email', 'transaction_id', 'rating', 'is_request',
+            )
+            .order_by('id')
+        )
+        params = DonationListQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        if params.validated_data.get('campaign'):
+            donations = donations.filter(campaign_id=params.validated_data['campaign'])
+        if params.validated_data.get('payment_status'):
+            donations = donations.filter(payment_status=params.validated_data['payment_status'])
+
+        return stream_export(donations, self.COLUMNS, export_format, 'donations')
+
+
 # ---------------------------
 # Stripe Checkout & Webhook
 # ---------------------------
@@ -144,6 +210,7 @@ class CreateDonationCheckoutSessionView(CreateAPIView):
             return Response({'error': 'Email is required for guest donations'}, status=status.HTTP_400_BAD_REQUEST)
 
         metadata = {
+            'donation': 'true',
             'user_id': str(user.id) if user else '',
             'donor_name': donor_name,
             'donor_email': donor_email,
@@ -152,7 +219,9 @@ class CreateDonationCheckoutSessionView(CreateAPIView):
         }
 
         try:
-            session = stripe.checkout.Session.create(
+            checkout_url = create_checkout_url(
+                request,
+                'donation',
                 payment_method_types=['card'],
                 line_items=[{
                     'price_data': {
@@ -167,7 +236,9 @@ class CreateDonationCheckoutSessionView(CreateAPIView):
                 success_url='myapp://payment-success',
                 cancel_url='myapp://payment-cancel',
             )
-            return Response({'checkout_url': session.url}, status=status.HTTP_200_OK)
+            return Response({'checkout_url': checkout_url}, status=status.HTTP_200_OK)
+        except IdempotencyKeyError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except stripe.error.StripeError as e:
             logger.error(f"Stripe checkout session creation failed: {e}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -176,6 +247,16 @@ class CreateDonationCheckoutSessionView(CreateAPIView):
             return Response({'error': 'An unexpected error occurred'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class StripeMetricsView(APIView):
+    """
+    Admin-only snapshot of outgoing Stripe call latency and retries for this worker process.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(stripe_stats.snapshot(), status=status.HTTP_200_OK)
+
+
 class RateDonationView(APIView):
     """
     API view to rate a donation (alternative to the action in DonationViewSet).
@@ -191,16 +272,37 @@ class RateDonationView(APIView):
         rating = serializer.validated_data['rating']
 
         try:
-            donation = Donation.objects.get(id=donation_id)
+            donation = Donation.objects.only('id', 'campaign_id').get(id=donation_id)
         except Donation.DoesNotExist:
             return Response({"detail": "Donation not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        donation.rating = rating
-        donation.save()
+        donation.rate(rating)
 
         return Response({"detail": "Thank you for your rating!"}, status=status.HTTP_200_OK)
 
 
+class BulkRateDonationView(APIView):
+    """
+    API view to rate many donations in one request, e.g. ratings queued offline.
+    Applied with a single bulk update; ids that don't exist are reported back.
+    Accessible by any user, like the single rating endpoints.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        serializer = BulkRateDonationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # Later pairs for the same donation win
+        ratings = {item['donation_id']: item['rating'] for item in serializer.validated_data['ratings']}
+        found = Donation.apply_ratings(ratings)
+
+        return Response({
+            "updated": len(found),
+            "missing": sorted(set(ratings) - found),
+        }, status=status.HTTP_200_OK)
+
+
 # @method_decorator(csrf_exempt, name='dispatch')
 # class StripeWebhookView(APIView):
 #     """
@@ -303,33 +405,28 @@ class AdminDonationSummaryView(APIView):
     """
     API view for administrators to see a summary of all donations,
     including total donations and donations per user.
+    Donors come from the DonorTotal table, largest total first, one cursor page at a time.
     """
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        total_all = Donation.objects.filter(payment_status='completed').aggregate(
-            total_all=Sum('amount')
-        )['total_all'] or 0.0
-
-        # Annotate user details and sum their donations
-        per_user = Donation.objects.filter(payment_status='completed').values(
-            'user__id', 'user__email', 'donor_name' # Include donor_name for guests
-        ).annotate(user_total=Sum('amount')).order_by('-user_total')
-
-        data = []
-        for row in per_user:
-            # Prioritize authenticated user's email, then donor_name, then 'Guest'
-            display_name = row['user__email'] if row['user__email'] else (row['donor_name'] if row['donor_name'] != 'Guest' else 'Guest')
-
-            data.append({
-                'user_id': row['user__id'],
-                'user_identifier': display_name, # Use a more generic term as it could be email or guest name
-                'user_total': row['user_total']
-            })
+        paginator = DonorTotalCursorPagination()
+        donors = paginator.paginate_queryset(DonorTotal.objects.all(), request, view=self)
+
+        data = [
+            {
+                'user_id': donor.user_id,
+                'user_identifier': donor.display_name,  # email for accounts, name or email for guests
+                'user_total': donor.total_amount,
+                'donation_count': donor.donation_count,
+            }
+            for donor in donors
+        ]
 
         serializer = AdminDonationSummarySerializer({
-            'total_all_users': total_all,
-            'per_user_donations': data
+            'total_all_users': TotalDonation.totals()['total_amount'],
+            'next': paginator.get_next_link(),
+            'per_user_donations': data,
         })
 
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -342,16 +439,37 @@ class PublicDonationSummaryView(APIView):
     """
     permission_classes = [AllowAny]
 
+    @cache_public_stats()
     def get(self, request):
-        summary = TotalDonation.objects.first()
-        if summary:
-            serializer = TotalDonationSerializer(summary)
-        else:
-            # Return a default empty summary if no TotalDonation object exists
-            serializer = TotalDonationSerializer({'total_amount': 0.0, 'total_count': 0})
+        # Sum of all counter shards
+        serializer = TotalDonationSerializer(TotalDonation.totals())
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class DonationLeaderboardView(APIView):
+    """
+    API view for the top donors overall or, with ?campaign=<id>, for one campaign.
+    Reads the first ?limit= rows of the incrementally maintained leaderboard.
+    Accessible by any user.
+    """
+    permission_classes = [AllowAny]
+
+    @cache_public_stats(query=LeaderboardQuerySerializer)
+    def get(self, request):
+        serializer = LeaderboardQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        entries = LeaderboardEntry.top(params.get('campaign'), params['limit'])
+        for rank, entry in enumerate(entries, start=1):
+            entry.rank = rank
+
+        return Response({
+            'campaign': params.get('campaign'),
+            'results': LeaderboardEntrySerializer(entries, many=True).data,
+        }, status=status.HTTP_200_OK)
+
+
 class MonthlyDonationGraphView(APIView):
     """
     API view to get weekly donation totals for the current month,
@@ -359,21 +477,21 @@ class MonthlyDonationGraphView(APIView):
     """
     permission_classes = [AllowAny]
 
+    @cache_public_stats()
     def get(self, request):
         now = datetime.datetime.now()
         current_month = now.month
         current_year = now.year
 
-        # Filter donations for the current month and annotate by week
+        # Sum the current month's daily rollup rows by week
         donations = (
-            Donation.objects.filter(
-                payment_status='completed',
-                donated_at__year=current_year,
-                donated_at__month=current_month
+            DonationDailyRollup.objects.filter(
+                date__year=current_year,
+                date__month=current_month
             )
-            .annotate(week=TruncWeek('donated_at'))
+            .annotate(week=TruncWeek('date'))
             .values('week')
-            .annotate(total_amount=Sum('amount'))
+            .annotate(total_amount=Sum('total_amount'))
             .order_by('week')
         )
 
@@ -421,18 +539,16 @@ class YearlyDonationGraphView(APIView):
     """
     permission_classes = [AllowAny]
 
+    @cache_public_stats()
     def get(self, request):
         current_year = datetime.datetime.now().year
 
-        # Get monthly donation totals for current year
+        # Get monthly donation totals for current year from the daily rollup
         donations = (
-            Donation.objects.filter(
-                payment_status='completed',
-                donated_at__year=current_year
-            )
-            .annotate(month=TruncMonth('donated_at'))
+            DonationDailyRollup.objects.filter(date__year=current_year)
+            .annotate(month=TruncMonth('date'))
             .values('month')
-            .annotate(total_amount=Sum('amount'))
+            .annotate(total_amount=Sum('total_amount'))
             .order_by('month')
         )
 
@@ -448,4 +564,54 @@ class YearlyDonationGraphView(APIView):
                 "total_amount": donation_data.get(month_num, 0.0)
             })
 
-        return Response(months_data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(months_data, status=status.HTTP_200_OK)
+
+
+class DonationGraphView(APIView):
+    """
+    API view to get donation totals for any date range, bucketed by day, week,
+    month or year, optionally for a single campaign. Reads the daily rollup, so the
+    cost depends on the range, not on the number of donations. Accessible by any user.
+    """
+    permission_classes = [AllowAny]
+
+    GRANULARITIES = {
+        'day': TruncDay,
+        'week': TruncWeek,
+        'month': TruncMonth,
+        'year': TruncYear,
+    }
+
+    @cache_public_stats(query=DonationGraphQuerySerializer)
+    def get(self, request):
+        serializer = DonationGraphQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        end = params.get('end') or datetime.date.today()
+        start = params.get('start') or end - datetime.timedelta(days=29)
+        if start > end:
+            return Response({'error': 'start must not be after end'}, status=status.HTTP_400_BAD_REQUEST)
+
+        rollups = DonationDailyRollup.objects.filter(date__range=(start, end))
+        if params.get('campaign'):
+            rollups = rollups.filter(campaign_id=params['campaign'])
+
+        trunc = self.GRANULARITIES[params['granularity']]
+        buckets = (
+            rollups.annotate(period=trunc('date'))
+            .values('period')
+            .annotate(total_amount=Sum('total_amount'), count=Sum('donation_count'))
+            .order_by('period')
+        )
+
+        data = [
+            {
+                'period': row['period'].isoformat(),
+                'total_amount': float(row['total_amount']),
+                'count': row['count'],
+            }
+            for row in buckets
+        ]
+        return Response(data, status=status.HTTP_200_OK)
+
@@ -0,0 +1,26 @@
+# main/checks.py
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Public stats invalidation, the recompute lock, checkout idempotency keys and the
+    chat throttle all coordinate through the default cache. Donations complete in the
+    Stripe inbox worker, so a per-process cache leaves web processes serving stale totals.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f"The default cache ({backend}) is private to each process.",
+            hint="Set REDIS_URL so web and worker processes share one cache.",
+            id='main.E001',
+        )]
+    return []
@@ -0,0 +1,77 @@
+import operator
+from functools import reduce
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Q, Value, When
+
+
+def increment_or_create(model, lookup, increments, values=None, defaults=None):
+    """
+    Add `increments` ({field: amount}) to the row matching `lookup` and write `values`,
+    creating the row with those amounts plus `defaults` when there is none yet.
+
+    `lookup` must be covered by a unique constraint: when two callers both miss and
+    race to create, the loser's insert fails on it and falls back to the update, so
+    no increment is lost. Call inside the caller's transaction.
+    """
+    values = values or {}
+    update = {field: F(field) + amount for field, amount in increments.items()}
+    update.update(values)
+    if model.objects.filter(**lookup).update(**update):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **increments, **values, **(defaults or {}))
+    except IntegrityError:
+        model.objects.filter(**lookup).update(**update)
+
+
+def increment_or_create_many(model, rows, batch_size=250):
+    """
+    increment_or_create for many rows: `rows` is a list of (lookup, increments, values,
+    defaults) with distinct lookups over the same fields. Each batch costs one SELECT
+    for the rows that exist, one UPDATE adding all their increments (a CASE on the
+    primary key, as bulk_update builds) and one INSERT for the rest. If another writer
+    created one of those meanwhile, the INSERT fails on the unique constraint and the
+    batch's new rows fall back to increment_or_create one at a time.
+    """
+    if len(rows) == 1:
+        increment_or_create(model, *rows[0])
+        return
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        fields = list(batch[0][0])
+        if len(fields) == 1:
+            match = Q(**{f'{fields[0]}__in': [lookup[fields[0]] for lookup, *_ in batch]})
+        else:
+            match = reduce(operator.or_, (Q(**lookup) for lookup, *_ in batch))
+        existing = {tuple(found[1:]): found[0] for found in model.objects.filter(match).values_list('pk', *fields)}
+        updates, missing = [], []
+        for lookup, increments, values, defaults in batch:
+            pk = existing.get(tuple(lookup[field] for field in fields))
+            if pk is None:
+                missing.append((lookup, increments, values, defaults))
+            else:
+                updates.append((pk, increments, values or {}))
+
+        if updates:
+            changes = {}
+            for pk, increments, values in updates:
+                for field, amount in increments.items():
+                    changes.setdefault(field, []).append(When(pk=pk, then=F(field) + amount))
+                for field, value in values.items():
+                    changes.setdefault(field, []).append(When(pk=pk, then=Value(value)))
+            model.objects.filter(pk__in=[pk for pk, _, _ in updates]).update(**{
+                field: Case(*whens, default=F(field), output_field=model._meta.get_field(field))
+                for field, whens in changes.items()
+            })
+        if missing:
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create([
+                        model(**lookup, **increments, **(values or {}), **(defaults or {}))
+                        for lookup, increments, values, defaults in missing
+                    ])
+            except IntegrityError:
+                for row in missing:
+                    increment_or_create(model, *row)
@@ -0,0 +1,50 @@
+# main/idempotency.py
+
+import hashlib
+import json
+
+import stripe
+from django.conf import settings
+from django.core.cache import cache
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyError(Exception):
+    """The Idempotency-Key is malformed or was already used with different parameters."""
+
+
+def _fingerprint(params):
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def create_checkout_url(request, scope, **params):
+    """
+    Create a Stripe Checkout Session and return its URL.
+
+    With an Idempotency-Key header the URL is cached per (scope, user, key) for
+    CHECKOUT_IDEMPOTENCY_TTL seconds and returned on repeats without calling Stripe.
+    The key is also forwarded to Stripe, so concurrent retries that both miss the
+    cache still get the same session back.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER, '').strip()
+    if not key:
+        return stripe.checkout.Session.create(**params).url
+    if len(key) > MAX_KEY_LENGTH:
+        raise IdempotencyKeyError(f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters')
+
+    owner = request.user.pk if request.user.is_authenticated else 'anon'
+    scoped = hashlib.sha256(f'{scope}:{owner}:{key}'.encode()).hexdigest()
+    cache_key = f'idempotency:checkout:{scoped}'
+    fingerprint = _fingerprint(params)
+
+    cached = cache.get(cache_key)
+    if cached is not None:
+        if cached['fingerprint'] != fingerprint:
+            raise IdempotencyKeyError(f'{IDEMPOTENCY_HEADER} was already used with different parameters')
+        return cached['url']
+
+    session = stripe.checkout.Session.create(idempotency_key=scoped, **params)
+    cache.set(cache_key, {'fingerprint': fingerprint, 'url': session.url}, settings.CHECKOUT_IDEMPOTENCY_TTL)
+    return session.url
@@ -0,0 +1,110 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Variants live under a SHA-256 of their source, so their bytes never change
+IMMUTABLE_PREFIXES = ('variants/',)
+
+
+def _etag(stat):
+    return f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+
+def _cache_control(path):
+    if path.startswith(IMMUTABLE_PREFIXES):
+        return 'public, max-age=31536000, immutable'
+    return f'public, max-age={settings.MEDIA_CACHE_SECONDS}'
+
+
+def _byte_range(header, size):
+    """(start, end) inclusive for a single satisfiable range, None to send everything, False if unsatisfiable."""
+    match = RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start, end = int(first), int(last) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size or start > end:
+        return False
+    return start, min(end, size - 1)
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve a file from MEDIA_ROOT.
+
+    MEDIA_SERVE_MODE decides who sends the bytes:
+    'x-accel' hands the file to nginx through an internal location at MEDIA_ACCEL_PREFIX,
+    'x-sendfile' hands it to Apache/lighttpd, and 'django' (development) streams it from
+    Python. Caching headers and conditional requests are answered here in every mode;
+    with offloading, Range requests are handled by the front server.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (OSError, ValueError, SuspiciousFileOperation):
+        raise Http404('Media file not found')
+    if not os.path.isfile(full_path):
+        raise Http404('Media file not found')
+
+    etag = _etag(stat)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': _cache_control(path),
+        'Accept-Ranges': 'bytes',
+    }
+
+    if_none_match = request.headers.get('If-None-Match')
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    if (if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]) or (
+        not if_none_match and if_modified_since and int(stat.st_mtime) <= if_modified_since
+    ):
+        response = HttpResponseNotModified()
+        for name in ('ETag', 'Last-Modified', 'Cache-Control'):
+            response[name] = headers[name]
+        return response
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    mode = settings.MEDIA_SERVE_MODE
+
+    if mode in ('x-accel', 'x-sendfile'):
+        response = HttpResponse(content_type=content_type)
+        # Upload names keep Unicode; headers must be ASCII, and nginx and mod_xsendfile decode %-escapes
+        if mode == 'x-accel':
+            response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + path.lstrip('/'))
+        else:
+            response['X-Sendfile'] = quote(full_path)
+    else:
+        byte_range = None
+        if request.headers.get('If-Range', etag) == etag:
+            byte_range = _byte_range(request.headers.get('Range'), stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        if byte_range:
+            start, end = byte_range
+            with open(full_path, 'rb') as fh:
+                fh.seek(start)
+                response = HttpResponse(fh.read(end - start + 1), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        else:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+
+    for name, value in headers.items():
+        response[name] = value
+    return response
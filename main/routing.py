@@ -1,6 +1,9 @@
 from django.urls import path
 from chat.consumers import ChatConsumer
+from donation.consumers import CampaignProgressConsumer
 
 websocket_urlpatterns = [
     path("ws/chat/", ChatConsumer.as_asgi()),
+    path("ws/campaigns/", CampaignProgressConsumer.as_asgi()),
+    path("ws/campaigns/<int:campaign_id>/", CampaignProgressConsumer.as_asgi()),
 ]
@@ -13,6 +13,12 @@ STRIPE_WEBHOOK_SECRET = config("STRIPE_WEBHOOK_SECRET")
 SECRET_KEY = config('SECRET_KEY', default='django-insecure-bgt5*%=^sk$6l$3lc4*z3$@&iwm2w%32^n2^4071@4=wcjtio=')
 MEDIA_URL = '/profile_pics/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'profile_pics')
+# Who sends media bytes: 'django' (development), 'x-accel' (nginx internal location at
+# MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT) or 'x-sendfile' (Apache/lighttpd)
+MEDIA_SERVE_MODE = config('MEDIA_SERVE_MODE', default='django')
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+# Browser cache lifetime for uploads that can be replaced in place; content-hashed variants are immutable
+MEDIA_CACHE_SECONDS = config('MEDIA_CACHE_SECONDS', default=3600, cast=int)
 DEBUG = True
 CORS_ALLOW_ALL_ORIGINS = True
 ALLOWED_HOSTS = ['*']
@@ -29,6 +35,7 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt',
     'djoser',
     'corsheaders',
+    'main',
     'users',
     'dashboard',
     'subscription',
@@ -41,6 +48,42 @@ INSTALLED_APPS = [
 
 ASGI_APPLICATION = 'main.asgi.application'
 
+# Shared by every web and worker process in production (public stats invalidation, checkout
+# idempotency keys, chat throttling). Without it each process gets a private in-memory cache,
+# which is only correct for a single-process development server; `check --deploy` flags it.
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+
+# Donations complete in the process_stripe_events worker, not in the ASGI process holding the
+# campaign sockets, so progress pushes need a layer shared across processes. The in-memory layer
+# only reaches consumers in its own process and is for the development server; `check --deploy` flags it.
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [REDIS_URL]},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
+
 
 DJOSER = {
     'PASSWORD_RESET_CONFIRM_URL': 'reset-password/{uid}/{token}',
@@ -62,6 +105,49 @@ STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY')
 STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY')
 # print(f"33Stripe Secret Key: {STRIPE_PUBLISHABLE_KEY}")  
 
+# Outgoing Stripe calls: API host (point at `manage.py fake_stripe_server` to benchmark offline),
+# connect/read timeouts in seconds, keep-alive pool size, and retries per call on top of a
+# shared budget of STRIPE_RETRY_BUDGET_RATIO retries per request
+STRIPE_API_BASE = config('STRIPE_API_BASE', default='https://api.stripe.com')
+STRIPE_CONNECT_TIMEOUT = config('STRIPE_CONNECT_TIMEOUT', default=3.05, cast=float)
+STRIPE_READ_TIMEOUT = config('STRIPE_READ_TIMEOUT', default=10, cast=float)
+STRIPE_POOL_SIZE = config('STRIPE_POOL_SIZE', default=20, cast=int)
+STRIPE_MAX_NETWORK_RETRIES = config('STRIPE_MAX_NETWORK_RETRIES', default=2, cast=int)
+STRIPE_RETRY_BUDGET_RATIO = config('STRIPE_RETRY_BUDGET_RATIO', default=0.2, cast=float)
+
+# Chat retrieval context cache: idle lifetime in seconds and the query similarity needed to reuse it
+CHAT_RETRIEVAL_CACHE_TTL = config('CHAT_RETRIEVAL_CACHE_TTL', default=900, cast=int)
+CHAT_RETRIEVAL_REUSE_SIMILARITY = config('CHAT_RETRIEVAL_REUSE_SIMILARITY', default=0.9, cast=float)
+
+# Chat usage ledger: rows are flushed once this many are pending or, by a timer, this many seconds after the first
+CHAT_USAGE_BUFFER_SIZE = config('CHAT_USAGE_BUFFER_SIZE', default=50, cast=int)
+CHAT_USAGE_FLUSH_SECONDS = config('CHAT_USAGE_FLUSH_SECONDS', default=5, cast=int)
+
+# Chat throttle for users without an active subscription (plans carry their own limits).
+# A limit of 0 turns chat off for free users.
+CHAT_FREE_MESSAGES_PER_HOUR = config('CHAT_FREE_MESSAGES_PER_HOUR', default=20, cast=int)
+CHAT_FREE_BURST = config('CHAT_FREE_BURST', default=5, cast=int)
+
+# Global donation totals are spread over this many counter rows
+TOTAL_DONATION_SHARDS = config('TOTAL_DONATION_SHARDS', default=16, cast=int)
+
+# Each day's rollup row per campaign (and for general donations) is spread over this many rows
+DONATION_ROLLUP_SHARDS = config('DONATION_ROLLUP_SHARDS', default=8, cast=int)
+
+# Public donation stats responses: fresh for this long unless a donation completes,
+# then served stale (for at most the second value) while one request recomputes
+PUBLIC_STATS_CACHE_SECONDS = config('PUBLIC_STATS_CACHE_SECONDS', default=300, cast=int)
+PUBLIC_STATS_STALE_SECONDS = config('PUBLIC_STATS_STALE_SECONDS', default=86400, cast=int)
+
+# How long a checkout session URL is replayed for a repeated Idempotency-Key
+CHECKOUT_IDEMPOTENCY_TTL = config('CHECKOUT_IDEMPOTENCY_TTL', default=600, cast=int)
+
+# Threads rendering resized WebP/JPEG variants of uploaded campaign and profile images
+IMAGE_PIPELINE_WORKERS = config('IMAGE_PIPELINE_WORKERS', default=2, cast=int)
+
+# Minimum seconds between websocket progress pushes for one campaign
+CAMPAIGN_PROGRESS_PUSH_INTERVAL = config('CAMPAIGN_PROGRESS_PUSH_INTERVAL', default=0.25, cast=float)
+
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
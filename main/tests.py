@@ -0,0 +1,12 @@
+from django.test import SimpleTestCase, override_settings
+
+from .checks import check_shared_cache
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+
+    def test_deploy_check_requires_a_shared_cache(self):
+        self.assertEqual([error.id for error in check_shared_cache(None)], ['main.E001'])
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache:6379/0'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(check_shared_cache(None), [])
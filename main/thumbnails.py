@@ -0,0 +1,114 @@
+# main/thumbnails.py
+
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# name -> (width, height); height None keeps the aspect ratio, otherwise the image is centre-cropped
+CAMPAIGN_VARIANTS = {'small': (320, None), 'medium': (720, None), 'large': (1280, None)}
+AVATAR_VARIANTS = {'sm': (64, 64), 'md': (128, 128), 'lg': (256, 256)}
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Resizing is CPU bound but Pillow releases the GIL while encoding, so a few threads go a long way
+executor = ThreadPoolExecutor(max_workers=settings.IMAGE_PIPELINE_WORKERS, thread_name_prefix='image-variants')
+
+
+def render_variant(image, size, fmt):
+    width, height = size
+    if height is None:
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+    else:
+        image = ImageOps.fit(image, (width, height), Image.LANCZOS)
+
+    pil_format, options = FORMATS[fmt]
+    if pil_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def build_variants(data, sizes):
+    """
+    Write every size/format of `data` under a path derived from its SHA-256, so the
+    same upload is only processed once and variant URLs can be cached forever.
+    Returns {'sha256': ..., 'sizes': {name: {fmt: storage path}}}.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    image.load()
+
+    paths = {}
+    for name, size in sizes.items():
+        paths[name] = {}
+        for fmt in FORMATS:
+            path = f'variants/{digest[:2]}/{digest}/{name}.{"jpg" if fmt == "jpeg" else fmt}'
+            if not default_storage.exists(path):
+                default_storage.save(path, ContentFile(render_variant(image, size, fmt)))
+            paths[name][fmt] = path
+    return {'sha256': digest, 'sizes': paths}
+
+
+def generate_variants(model_label, pk, field_name, variants_field, sizes):
+    """Worker job: render variants for one object's image unless it was replaced meanwhile."""
+    model = apps.get_model(model_label)
+    try:
+        source = model.objects.filter(pk=pk).values_list(field_name, flat=True).first()
+        if not source:
+            return
+        with default_storage.open(source, 'rb') as fh:
+            variants = build_variants(fh.read(), sizes)
+        variants['source'] = source
+        model.objects.filter(pk=pk, **{field_name: source}).update(**{variants_field: variants})
+    except Exception:
+        logger.exception("Image variant generation failed for %s %s", model_label, pk)
+    finally:
+        close_old_connections()
+
+
+def sync_image_variants(instance, field_name, variants_field, sizes):
+    """
+    Call from save(): clears stale variants when the image is removed and, once the
+    transaction commits, queues variant generation when the image changed.
+    """
+    source = getattr(instance, field_name).name or ''
+    variants = getattr(instance, variants_field) or {}
+    if not source:
+        if variants:
+            type(instance).objects.filter(pk=instance.pk).update(**{variants_field: {}})
+            setattr(instance, variants_field, {})
+        return
+    if variants.get('source') == source:
+        return
+
+    args = (instance._meta.label, instance.pk, field_name, variants_field, sizes)
+    transaction.on_commit(lambda: executor.submit(generate_variants, *args))
+
+
+def variant_urls(variants, request=None):
+    """{name: {fmt: url}} for a serializer; absolute when a request is available, like ImageField."""
+    urls = {}
+    for name, formats in (variants or {}).get('sizes', {}).items():
+        urls[name] = {}
+        for fmt, path in formats.items():
+            url = default_storage.url(path)
+            urls[name][fmt] = request.build_absolute_uri(url) if request is not None else url
+    return urls
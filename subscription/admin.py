@@ -1,7 +1,8 @@
 from django.contrib import admin
 
 # Register your models here.
-from subscription.models import SubscriptionPlan, UserSubscription
+from subscription.models import SubscriptionPlan, UserSubscription, StripeEvent
 
 admin.site.register(SubscriptionPlan)
-admin.site.register(UserSubscription)
\ No newline at end of file
+admin.site.register(UserSubscription)
+admin.site.register(StripeEvent)
@@ -0,0 +1,34 @@
+"""
+Applies the Stripe webhook events queued in the StripeEvent inbox. In production keep
+it running with --loop under a process supervisor, e.g. a systemd service:
+
+    ExecStart=/srv/app/venv/bin/python manage.py process_stripe_events --loop
+    Restart=always
+
+Without --loop it drains the inbox once and exits, which suits cron or a one-off run.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from subscription.stripe_events import drain_inbox
+
+
+class Command(BaseCommand):
+    help = "Apply queued Stripe webhook events from the StripeEvent inbox (run with --loop as a long-lived service)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--workers", type=int, default=4, help="Threads applying events from each batch.")
+        parser.add_argument("--loop", action="store_true", help="Keep polling instead of exiting once the inbox is empty.")
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds to sleep between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            handled = drain_inbox(options["batch_size"], options["workers"])
+            if handled:
+                self.stdout.write(f"Processed {handled} Stripe events")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,166 @@
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from chat.throttles import forget_chat_limits
+from donation.models import Donation, DonationCampaign
+from subscription.models import SubscriptionPlan, UserSubscription
+
+User = get_user_model()
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile checkout.session.completed events from a Stripe JSONL export "
+        "(one event per line, oldest first). Existing transaction ids are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSONL file of Stripe events.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Parse and resolve without writing anything.")
+
+    def handle(self, *args, **options):
+        self.dry_run = options["dry_run"]
+        self.stats = defaultdict(int)
+
+        with open(options["path"]) as f:
+            lines = (line for line in f if line.strip())
+            while True:
+                batch = list(islice(lines, options["batch_size"]))
+                if not batch:
+                    break
+                self.replay_batch([json.loads(line) for line in batch])
+                self.stdout.write(f"... {self.stats['read']} events read")
+
+        self.stdout.write(self.style.SUCCESS(
+            "Read {read}, donations created {donations}, subscriptions created {subscriptions}, "
+            "already recorded {existing}, ignored {ignored}".format_map(self.stats)
+        ))
+
+    def replay_batch(self, events):
+        donations, subscriptions = [], []
+        for event in events:
+            self.stats["read"] += 1
+            if event.get("type") != "checkout.session.completed":
+                self.stats["ignored"] += 1
+                continue
+            session = event["data"]["object"]
+            metadata = session.get("metadata") or {}
+            if metadata.get("donation") == "true":
+                donations.append((session, event.get("created")))
+            elif metadata.get("subscription") == "true":
+                subscriptions.append(session)
+            else:
+                self.stats["ignored"] += 1
+
+        with transaction.atomic():
+            if donations:
+                self.replay_donations(donations)
+            if subscriptions:
+                self.replay_subscriptions(subscriptions)
+            if self.dry_run:
+                transaction.set_rollback(True)
+
+    def replay_donations(self, events):
+        """Create the batch's missing donations and apply every total they feed, all in the batch's transaction."""
+        ids = [s["id"] for s, _ in events]
+        existing = set(Donation.objects.filter(transaction_id__in=ids).values_list("transaction_id", flat=True))
+        events = [(s, created) for s, created in events if s["id"] not in existing]
+        sessions = [s for s, _ in events]
+        self.stats["existing"] += len(existing)
+
+        user_ids = {_int_or_none(s["metadata"].get("user_id")) for s in sessions} - {None}
+        campaign_ids = {_int_or_none(s["metadata"].get("campaign_id")) for s in sessions} - {None}
+        users = set(User.objects.filter(id__in=user_ids).values_list("id", flat=True))
+        campaigns = set(DonationCampaign.objects.filter(id__in=campaign_ids).values_list("id", flat=True))
+
+        seen, rows, donated_at = set(), [], []
+        for session, created in events:
+            if session["id"] in seen:
+                continue
+            seen.add(session["id"])
+            donated_at.append(datetime.fromtimestamp(created, tz=dt_timezone.utc) if created else None)
+            metadata = session["metadata"]
+            user_id = _int_or_none(metadata.get("user_id"))
+            campaign_id = _int_or_none(metadata.get("campaign_id"))
+            rows.append(Donation(
+                user_id=user_id if user_id in users else None,
+                campaign_id=campaign_id if campaign_id in campaigns else None,
+                donor_name=metadata.get("donor_name", "Guest"),
+                donor_email=metadata.get("donor_email"),
+                amount=Decimal(session.get("amount_total", 0)) / 100,
+                currency=(session.get("currency") or "USD").upper(),
+                message=metadata.get("message", ""),
+                transaction_id=session["id"],
+                payment_status="completed",
+                is_request=False,
+            ))
+
+        Donation.objects.bulk_create(rows)
+        # auto_now_add stamped the rows with the replay time; date them by the Stripe event instead
+        for donation, created in zip(rows, donated_at):
+            donation.donated_at = created or donation.donated_at
+        if any(donated_at):
+            Donation.objects.bulk_update(rows, ["donated_at"])
+        # bulk_create skips Donation.save, so the batch's totals are applied here in one go
+        Donation.apply_completed(rows)
+        self.stats["donations"] += len(rows)
+
+    def replay_subscriptions(self, sessions):
+        ids = [s["id"] for s in sessions]
+        existing = set(
+            UserSubscription.objects.filter(transaction_id__in=ids).values_list("transaction_id", flat=True)
+        )
+        self.stats["existing"] += len(existing)
+
+        user_ids = {_int_or_none(s["metadata"].get("user_id")) for s in sessions} - {None}
+        plan_ids = {_int_or_none(s["metadata"].get("plan_id")) for s in sessions} - {None}
+        users = set(User.objects.filter(id__in=user_ids).values_list("id", flat=True))
+        plans = SubscriptionPlan.objects.in_bulk(plan_ids)
+
+        # Like the webhook, the newest subscription per user stays active; the file is in event order
+        valid, latest = {}, {}
+        for session in sessions:
+            metadata = session["metadata"]
+            user_id = _int_or_none(metadata.get("user_id"))
+            plan = plans.get(_int_or_none(metadata.get("plan_id")))
+            if session["id"] in existing:
+                continue
+            if user_id not in users or plan is None:
+                self.stats["ignored"] += 1
+                continue
+            valid[session["id"]] = (user_id, plan)
+            latest[user_id] = session["id"]
+
+        now = timezone.now()
+        UserSubscription.objects.filter(user_id__in=latest.keys(), is_active=True).update(is_active=False)
+        UserSubscription.objects.bulk_create([
+            UserSubscription(
+                user_id=user_id,
+                plan=plan,
+                end_date=now + timedelta(days=plan.duration_days),
+                payment_status="completed",
+                transaction_id=transaction_id,
+                is_active=latest[user_id] == transaction_id,
+            )
+            for transaction_id, (user_id, plan) in valid.items()
+        ])
+        User.objects.filter(id__in=latest.keys()).update(is_subscribed=True)
+        for user_id in latest:
+            forget_chat_limits(user_id)
+        self.stats["subscriptions"] += len(valid)
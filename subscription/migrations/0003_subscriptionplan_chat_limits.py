@@ -0,0 +1,23 @@
+# Generated by Django 4.2.18 on 2026-10-19 11:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscription', '0002_subscriptionfeature'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subscriptionplan',
+            name='chat_burst',
+            field=models.PositiveIntegerField(default=20, help_text='Chat messages that may be sent back to back; 0 disables chat on this plan.'),
+        ),
+        migrations.AddField(
+            model_name='subscriptionplan',
+            name='chat_messages_per_hour',
+            field=models.PositiveIntegerField(default=120, help_text='Sustained chat message rate for subscribers; 0 disables chat on this plan.'),
+        ),
+    ]
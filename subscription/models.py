@@ -8,6 +8,8 @@ class SubscriptionPlan(models.Model):
     description = models.TextField(blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     duration_days = models.PositiveIntegerField(help_text="Duration of the subscription in days.")
+    chat_messages_per_hour = models.PositiveIntegerField(default=120, help_text="Sustained chat message rate for subscribers; 0 disables chat on this plan.")
+    chat_burst = models.PositiveIntegerField(default=20, help_text="Chat messages that may be sent back to back; 0 disables chat on this plan.")
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -49,7 +51,42 @@ class UserSubscription(models.Model):
         if not self.end_date and self.plan and self.start_date:
             self.end_date = self.start_date + timedelta(days=self.plan.duration_days)
         super().save(*args, **kwargs)
+        # Chat throttling caches the user's plan limits
+        from chat.throttles import forget_chat_limits
+        forget_chat_limits(self.user_id)
 
     @property
     def is_current_active(self):
         return self.is_active and self.end_date > timezone.now()
+
+
+class StripeEvent(models.Model):
+    """
+    Inbox of verified Stripe webhook events. The webhook only inserts here and
+    returns; `process_stripe_events` applies them. The unique event_id makes
+    Stripe's redeliveries no-ops.
+    """
+    STATUSES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('dead', 'Dead'),
+    ]
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUSES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['received_at']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.type} {self.event_id} ({self.status})"
@@ -23,6 +23,8 @@ class SubscriptionPlanSerializer(serializers.ModelSerializer):
             'price',
             'duration_days',
             'duration_weeks',
+            'chat_messages_per_hour',
+            'chat_burst',
             'is_active',
             'created_at',
             'updated_at',
@@ -0,0 +1,155 @@
+# subscription/stripe_events.py
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from donation.models import Donation, DonationCampaign
+from donation.realtime import flush_campaign_progress
+from .models import StripeEvent, SubscriptionPlan, UserSubscription
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 8
+# A worker that died mid-batch leaves rows in "processing"; reclaim them after this long
+LOCK_TIMEOUT = timedelta(minutes=10)
+
+
+def record_donation(session):
+    metadata = session.get('metadata', {})
+    transaction_id = session.get('id')
+    if Donation.objects.filter(transaction_id=transaction_id).exists():
+        return 'duplicate_ignored'
+
+    user = User.objects.filter(id=metadata.get('user_id') or None).first()
+    campaign = DonationCampaign.objects.filter(id=metadata.get('campaign_id') or None).first()
+
+    # Donation.save bumps the campaign and global totals atomically
+    donation = Donation.objects.create(
+        user=user,
+        campaign=campaign,
+        donor_name=metadata.get('donor_name', 'Guest'),
+        donor_email=metadata.get('donor_email'),
+        amount=Decimal(session.get('amount_total', 0)) / 100,
+        currency=session.get('currency', 'USD').upper(),
+        message=metadata.get('message', ''),
+        transaction_id=transaction_id,
+        payment_status='completed',
+        is_request=False
+    )
+    logger.info("Donation recorded: id=%s", donation.id)
+    return 'donation_success'
+
+
+def activate_subscription(session):
+    metadata = session.get('metadata', {})
+    transaction_id = session.get('id')
+    user = User.objects.get(id=metadata.get('user_id'))
+    plan = SubscriptionPlan.objects.get(id=metadata.get('plan_id'))
+
+    if not UserSubscription.objects.filter(user=user, transaction_id=transaction_id).exists():
+        UserSubscription.objects.filter(user=user, is_active=True).update(is_active=False)
+
+        UserSubscription.objects.create(
+            user=user,
+            plan=plan,
+            payment_status='completed',
+            transaction_id=transaction_id,
+            is_active=True
+        )
+
+        user.is_subscribed = True
+        user.save()
+
+    logger.info("Subscription activated for user: %s", user.id)
+    return 'subscription_success'
+
+
+def handle_event(event):
+    """Apply one Stripe event (a plain dict). Raises on failure so the caller can retry."""
+    if event['type'] == 'checkout.session.completed':
+        session = event['data']['object']
+        metadata = session.get('metadata', {})
+        logger.info("Stripe session completed received for transaction: %s", session.get('id'))
+
+        if metadata.get("donation") == "true":
+            return record_donation(session)
+        if metadata.get("subscription") == "true":
+            return activate_subscription(session)
+
+    logger.info("Unhandled webhook event type: %s", event['type'])
+    return 'event_not_handled'
+
+
+def claim_batch(batch_size):
+    """Mark up to `batch_size` due events as processing and return them."""
+    now = timezone.now()
+    due = (
+        Q(status='pending', next_attempt_at__lte=now)
+        | Q(status='processing', locked_at__lt=now - LOCK_TIMEOUT)
+    )
+    with transaction.atomic():
+        # skip_locked lets several workers drain the inbox without picking the same rows
+        events = list(
+            StripeEvent.objects.select_for_update(skip_locked=True)
+            .filter(due).order_by('next_attempt_at')[:batch_size]
+        )
+        StripeEvent.objects.filter(id__in=[e.id for e in events]).update(status='processing', locked_at=now)
+    return events
+
+
+def process_one(inbox_event):
+    try:
+        with transaction.atomic():
+            result = handle_event(inbox_event.payload)
+            StripeEvent.objects.filter(id=inbox_event.id).update(
+                status='done', processed_at=timezone.now(), attempts=inbox_event.attempts + 1, last_error=''
+            )
+        return result
+    except Exception as e:
+        attempts = inbox_event.attempts + 1
+        dead = attempts >= MAX_ATTEMPTS
+        logger.error(f"Stripe event {inbox_event.event_id} failed (attempt {attempts}): {e}", exc_info=True)
+        StripeEvent.objects.filter(id=inbox_event.id).update(
+            status='dead' if dead else 'pending',
+            attempts=attempts,
+            last_error=str(e),
+            locked_at=None,
+            next_attempt_at=timezone.now() + timedelta(seconds=2 ** attempts),
+        )
+        return 'dead' if dead else 'retry'
+
+
+def _process_in_thread(inbox_event):
+    try:
+        return process_one(inbox_event)
+    finally:
+        close_old_connections()
+
+
+def drain_inbox(batch_size=100, workers=1):
+    """
+    Process due inbox events batch by batch until none are left. Returns the count handled.
+    Coalesced campaign progress pushes are flushed before returning, since a one-shot
+    worker exits right after and would drop them.
+    """
+    handled = 0
+    while True:
+        batch = claim_batch(batch_size)
+        if not batch:
+            flush_campaign_progress()
+            return handled
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(_process_in_thread, batch))
+        else:
+            for inbox_event in batch:
+                process_one(inbox_event)
+        handled += len(batch)
@@ -1,3 +1,215 @@
+import datetime
+import io
+import json
+import os
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Sum
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from donation.models import Donation, DonationCampaign, DonationDailyRollup, TotalDonation
+from users.models import User
+from .models import StripeEvent, SubscriptionPlan, UserSubscription
+from .stripe_events import MAX_ATTEMPTS, drain_inbox
+
+
+def subscription_event(event_id, user, plan):
+    return {
+        'id': event_id,
+        'type': 'checkout.session.completed',
+        'data': {'object': {
+            'id': f'cs_{event_id}',
+            'amount_total': 999,
+            'currency': 'usd',
+            'metadata': {'subscription': 'true', 'user_id': str(user.id), 'plan_id': str(plan.id)},
+        }},
+    }
+
+
+class StripeWebhookInboxTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='member@example.com', password='pass12345')
+        self.plan = SubscriptionPlan.objects.create(name='Monthly', price='9.99', duration_days=30)
+
+    def post_event(self, event):
+        with mock.patch('stripe.Webhook.construct_event', return_value=event):
+            return self.client.post(reverse('stripe-webhook'), data=event, content_type='application/json')
+
+    def test_webhook_only_queues_the_event(self):
+        response = self.post_event(subscription_event('evt_1', self.user, self.plan))
+
+        self.assertEqual(response.json(), {'status': 'queued'})
+        self.assertEqual(StripeEvent.objects.get().status, 'pending')
+        self.assertFalse(UserSubscription.objects.exists())
+
+    def test_redelivered_event_is_ignored(self):
+        event = subscription_event('evt_1', self.user, self.plan)
+        self.post_event(event)
+
+        response = self.post_event(event)
+
+        self.assertEqual(response.json(), {'status': 'duplicate_ignored'})
+        self.assertEqual(StripeEvent.objects.count(), 1)
+
+    def test_worker_applies_queued_events(self):
+        self.post_event(subscription_event('evt_1', self.user, self.plan))
+
+        self.assertEqual(drain_inbox(), 1)
+
+        self.assertEqual(StripeEvent.objects.get().status, 'done')
+        self.assertTrue(UserSubscription.objects.filter(user=self.user, plan=self.plan, is_active=True).exists())
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_subscribed)
+
+    def test_failing_event_is_retried_then_dead_lettered(self):
+        event = subscription_event('evt_bad', self.user, self.plan)
+        event['data']['object']['metadata']['plan_id'] = '999'
+        self.post_event(event)
+
+        drain_inbox()
+        inbox_event = StripeEvent.objects.get()
+        self.assertEqual((inbox_event.status, inbox_event.attempts), ('pending', 1))
+        self.assertGreater(inbox_event.next_attempt_at, timezone.now())
+
+        for _ in range(MAX_ATTEMPTS - 1):
+            StripeEvent.objects.update(next_attempt_at=timezone.now())
+            drain_inbox()
+
+        inbox_event.refresh_from_db()
+        self.assertEqual((inbox_event.status, inbox_event.attempts), ('dead', MAX_ATTEMPTS))
+        self.assertIn('does not exist', inbox_event.last_error)
+
+
+class ReplayStripeEventsTests(TestCase):
+
+    def test_replay_creates_missing_records_and_updates_totals_once(self):
+        user = User.objects.create_user(email='member@example.com', password='pass12345')
+        plan = SubscriptionPlan.objects.create(name='Monthly', price='9.99', duration_days=30)
+        campaign = DonationCampaign.objects.create(
+            title='Clean water', organization='Wells', description='Wells.', goal_amount=Decimal('100.00')
+        )
+        Donation.objects.create(campaign=campaign, amount=Decimal('5.00'), payment_status='completed', transaction_id='cs_d0')
+
+        def donation(n, cents):
+            return {'type': 'checkout.session.completed', 'data': {'object': {
+                'id': f'cs_d{n}', 'amount_total': cents, 'currency': 'usd',
+                'metadata': {'donation': 'true', 'campaign_id': str(campaign.id), 'user_id': ''},
+            }}}
+
+        events = [donation(0, 500), donation(1, 1000), donation(2, 250), {'type': 'invoice.paid', 'data': {'object': {}}}]
+        events += [subscription_event('evt_s1', user, plan), subscription_event('evt_s2', user, plan)]
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as f:
+            f.write('\n'.join(json.dumps(e) for e in events))
+        self.addCleanup(os.remove, f.name)
+
+        call_command('replay_stripe_events', f.name, batch_size=2, stdout=io.StringIO())
+
+        self.assertEqual(Donation.objects.count(), 3)
+        campaign.refresh_from_db()
+        self.assertEqual((campaign.raised_amount, campaign.supporters), (Decimal('17.50'), 3))
+        self.assertEqual(TotalDonation.totals(), {'total_amount': Decimal('17.50'), 'total_count': 3})
+        active = UserSubscription.objects.get(user=user, is_active=True)
+        self.assertEqual(active.transaction_id, 'cs_evt_s2')
+        self.assertEqual(UserSubscription.objects.filter(user=user).count(), 2)
+        self.assertTrue(User.objects.get(id=user.id).is_subscribed)
+
+
+    def write_events(self, events):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as f:
+            f.write('\n'.join(json.dumps(e) for e in events))
+        self.addCleanup(os.remove, f.name)
+        return f.name
+
+    def donation_events(self, campaign, count, created=None):
+        return [
+            {'type': 'checkout.session.completed', 'created': created, 'data': {'object': {
+                'id': f'cs_r{n}', 'amount_total': 1000, 'currency': 'usd',
+                'metadata': {'donation': 'true', 'campaign_id': str(campaign.id)},
+            }}}
+            for n in range(count)
+        ]
+
+    def test_rerun_after_a_failed_batch_keeps_totals_complete(self):
+        campaign = DonationCampaign.objects.create(
+            title='Clean water', organization='Wells', description='Wells.', goal_amount=Decimal('100.00')
+        )
+        path = self.write_events(self.donation_events(campaign, 4))
+
+        add_many = DonationDailyRollup.add_many
+        calls = []
+
+        def fail_second_batch(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError('worker died')
+            return add_many(*args, **kwargs)
+
+        with mock.patch('donation.models.DonationDailyRollup.add_many',
+                        side_effect=fail_second_batch):
+            with self.assertRaises(RuntimeError):
+                call_command('replay_stripe_events', path, batch_size=2, stdout=io.StringIO())
+        self.assertEqual(Donation.objects.count(), 2)
+
+        call_command('replay_stripe_events', path, batch_size=2, stdout=io.StringIO())
+
+        campaign.refresh_from_db()
+        self.assertEqual((campaign.raised_amount, campaign.supporters), (Decimal('40.00'), 4))
+        self.assertEqual(TotalDonation.totals(), {'total_amount': Decimal('40.00'), 'total_count': 4})
+        self.assertEqual(DonationDailyRollup.objects.aggregate(n=Sum('donation_count'))['n'], 4)
+
+    def test_replayed_donations_are_dated_by_the_event(self):
+        campaign = DonationCampaign.objects.create(
+            title='Clean water', organization='Wells', description='Wells.', goal_amount=Decimal('100.00')
+        )
+        created = datetime.datetime(2024, 3, 5, 12, 0, tzinfo=datetime.timezone.utc)
+        path = self.write_events(self.donation_events(campaign, 2, created=int(created.timestamp())))
+
+        call_command('replay_stripe_events', path, stdout=io.StringIO())
+
+        self.assertEqual(set(Donation.objects.values_list('donated_at', flat=True)), {created})
+        self.assertEqual(
+            list(DonationDailyRollup.objects.values_list('date', 'donation_count')), [(created.date(), 2)],
+        )
+
+
+class SubscriptionExportTests(TestCase):
+
+    def test_ndjson_export_includes_plan_and_user(self):
+        admin = User.objects.create(email='admin@example.com', is_staff=True)
+        plan = SubscriptionPlan.objects.create(name='Monthly', price='9.99', duration_days=30)
+        UserSubscription.objects.create(user=admin, plan=plan, transaction_id='cs_1')
+        self.client.force_login(admin)
+
+        response = self.client.get(reverse('subscription-export', args=['ndjson']))
+
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(
+            [(row['user__email'], row['plan__name'], row['transaction_id']) for row in rows],
+            [('admin@example.com', 'Monthly', 'cs_1')],
+        )
+
+
+
+class PlanCheckoutIdempotencyTests(TestCase):
+
+    def test_key_is_scoped_per_user(self):
+        cache.clear()
+        plan = SubscriptionPlan.objects.create(name='Monthly', price='9.99', duration_days=30)
+        url = reverse('plan-create-checkout-session', args=[plan.id])
+        sessions = [mock.Mock(url='https://checkout.stripe.test/a'), mock.Mock(url='https://checkout.stripe.test/b')]
+
+        with mock.patch('stripe.checkout.Session.create', side_effect=sessions) as create:
+            for email in ('a@example.com', 'b@example.com'):
+                self.client.force_login(User.objects.create(email=email))
+                for _ in range(2):
+                    response = self.client.post(url, HTTP_IDEMPOTENCY_KEY='same-key')
 
-# Create your tests here.
+        self.assertEqual(create.call_count, 2)
+        self.assertEqual(response.json()['checkout_url'], 'https://checkout.stripe.test/b')
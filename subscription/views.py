@@ -11,16 +11,17 @@ from drf_yasg.utils import swagger_auto_schema
 from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
 
-from .models import SubscriptionPlan, UserSubscription
+from .models import SubscriptionPlan, UserSubscription, StripeEvent
 from .serializers import SubscriptionPlanSerializer, UserSubscriptionSerializer
 from users.serializers import UserSerializer
-from donation.models import Donation, DonationCampaign, TotalDonation
+from main.exports import EXPORT_FORMATS, stream_export
+from main.idempotency import IdempotencyKeyError, create_checkout_url
 
+import json
 import stripe
 import logging
 
 User = get_user_model()
-stripe.api_key = settings.STRIPE_SECRET_KEY
 logger = logging.getLogger(__name__)
 
 
@@ -46,7 +47,9 @@ class SubscriptionPlanViewSet(viewsets.ModelViewSet):
         plan = get_object_or_404(SubscriptionPlan.objects.all(), pk=pk)
 
         try:
-            session = stripe.checkout.Session.create(
+            checkout_url = create_checkout_url(
+                request,
+                f'plan:{plan.id}',
                 payment_method_types=['card'],
                 line_items=[{
                     'price_data': {
@@ -65,8 +68,10 @@ class SubscriptionPlanViewSet(viewsets.ModelViewSet):
                     'subscription': 'true'
                 }
             )
-            return Response({'checkout_url': session.url}, status=status.HTTP_200_OK)
+            return Response({'checkout_url': checkout_url}, status=status.HTTP_200_OK)
 
+        except IdempotencyKeyError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except stripe.error.StripeError as e:
             return Response({'detail': f'Stripe error: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
@@ -118,6 +123,31 @@ class SubscribedUsersView(APIView):
         return Response(serializer.data)
 
 
+class SubscriptionExportView(APIView):
+    """Streams every user subscription as CSV or NDJSON for administrators."""
+    permission_classes = [IsAdminUser]
+
+    COLUMNS = [
+        'id', 'user_id', 'user__email', 'plan_id', 'plan__name', 'start_date', 'end_date',
+        'is_active', 'payment_status', 'transaction_id',
+    ]
+
+    @swagger_auto_schema(auto_schema=None)
+    def get(self, request, export_format):
+        if export_format not in EXPORT_FORMATS:
+            return Response({'error': 'Unsupported export format'}, status=status.HTTP_404_NOT_FOUND)
+
+        subscriptions = (
+            UserSubscription.objects.select_related('user', 'plan')
+            .only(
+                'id', 'user', 'user__email', 'plan', 'plan__name', 'start_date', 'end_date',
+                'is_active', 'payment_status', 'transaction_id',
+            )
+            .order_by('id')
+        )
+        return stream_export(subscriptions, self.COLUMNS, export_format, 'subscriptions')
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class UnifiedStripeWebhookView(APIView):
     permission_classes = [AllowAny]
@@ -140,71 +170,12 @@ class UnifiedStripeWebhookView(APIView):
             logger.error(f"Error parsing webhook payload: {e}")
             return Response({"error": "Webhook error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        if event['type'] == 'checkout.session.completed':
-            session = event['data']['object']
-            metadata = session.get('metadata', {})
-            transaction_id = session.get('id')
-            logger.info("Stripe session completed received for transaction: %s", transaction_id)
-
-            if metadata.get("donation") == "true":
-                try:
-                    if Donation.objects.filter(transaction_id=transaction_id).exists():
-                        return Response({'status': 'duplicate_ignored'}, status=status.HTTP_200_OK)
-
-                    user = User.objects.filter(id=metadata.get('user_id')).first()
-                    campaign = DonationCampaign.objects.filter(id=metadata.get('campaign_id')).first()
-
-                    donation = Donation.objects.create(
-                        user=user,
-                        campaign=campaign,
-                        donor_name=metadata.get('donor_name', 'Guest'),
-                        donor_email=metadata.get('donor_email'),
-                        amount=session.get('amount_total', 0) / 100.0,
-                        currency=session.get('currency', 'USD').upper(),
-                        message=metadata.get('message', ''),
-                        transaction_id=transaction_id,
-                        payment_status='completed',
-                        is_request=False
-                    )
-
-                    if campaign:
-                        campaign.raised_amount += donation.amount
-                        campaign.supporters += 1
-                        campaign.save()
-
-                    TotalDonation.update_totals(donation.amount)
-                    logger.info("Donation recorded: id=%s", donation.id)
-                    return Response({'status': 'donation_success'}, status=status.HTTP_200_OK)
-
-                except Exception as e:
-                    logger.error(f"Donation webhook failed: {e}", exc_info=True)
-                    return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-            elif metadata.get("subscription") == "true":
-                try:
-                    user = User.objects.get(id=metadata.get('user_id'))
-                    plan = SubscriptionPlan.objects.get(id=metadata.get('plan_id'))
-
-                    if not UserSubscription.objects.filter(user=user, transaction_id=transaction_id).exists():
-                        UserSubscription.objects.filter(user=user, is_active=True).update(is_active=False)
-
-                        UserSubscription.objects.create(
-                            user=user,
-                            plan=plan,
-                            payment_status='completed',
-                            transaction_id=transaction_id,
-                            is_active=True
-                        )
-
-                        user.is_subscribed = True
-                        user.save()
-
-                    logger.info("Subscription activated for user: %s", user.id)
-                    return Response({'status': 'subscription_success'}, status=status.HTTP_200_OK)
-
-                except Exception as e:
-                    logger.error(f"Subscription webhook failed: {e}", exc_info=True)
-                    return Response({'error': f'Subscription error: {str(e)}'}, status=500)
-
-        logger.info("Unhandled webhook event type: %s", event['type'])
-        return Response({'status': 'event_not_handled'}, status=status.HTTP_200_OK)
+        # Only record the event here; process_stripe_events applies it, so Stripe
+        # gets its 200 without waiting on users, campaigns, donations or totals.
+        _, created = StripeEvent.objects.get_or_create(
+            event_id=event['id'],
+            defaults={'type': event['type'], 'payload': json.loads(payload)},
+        )
+        if not created:
+            return Response({'status': 'duplicate_ignored'}, status=status.HTTP_200_OK)
+        return Response({'status': 'queued'}, status=status.HTTP_200_OK)
@@ -3,6 +3,8 @@ from django.db import models
 from datetime import date
 from django.utils import timezone
 
+from main.thumbnails import AVATAR_VARIANTS, sync_image_variants
+
 
 def user_profile_upload_path(instance, filename):
     return f"profile_pics/user_{instance.id}/{filename}"
@@ -42,6 +44,7 @@ class User(AbstractUser):
     phone_number = models.CharField(max_length=20, blank=True, null=True)
 
     profile_picture = models.ImageField(upload_to=user_profile_upload_path, blank=True, null=True)
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_verified = models.BooleanField(default=False)
 
     otp = models.CharField(max_length=6, blank=True, null=True)
@@ -63,6 +66,10 @@ class User(AbstractUser):
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        sync_image_variants(self, 'profile_picture', 'profile_picture_variants', AVATAR_VARIANTS)
+
     @property
     def age(self):
         if self.date_of_birth:
@@ -9,10 +9,12 @@ from users.models import User, FriendBirthday, WishMessage
 
 from subscription.models import UserSubscription  
 from subscription.serializers import UserSubscriptionSerializer  
+from main.thumbnails import variant_urls
 
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8, required=True)
     profile_picture = serializers.ImageField(required=False, allow_null=True)
+    profile_picture_variants = serializers.SerializerMethodField()
     age = serializers.ReadOnlyField()
     subscriptions = UserSubscriptionSerializer(many=True, read_only=True) 
 
@@ -27,6 +29,7 @@ class UserSerializer(serializers.ModelSerializer):
             'password',
             'is_verified',
             'profile_picture',
+            'profile_picture_variants',
             'date_of_birth',
             'age',
             'is_subscribed',
@@ -41,6 +44,9 @@ class UserSerializer(serializers.ModelSerializer):
         }
         ref_name = 'CustomUserSerializer'
 
+    def get_profile_picture_variants(self, obj):
+        return variant_urls(obj.profile_picture_variants, self.context.get('request'))
+
 
 
 class CountrySerializer(serializers.ModelSerializer):
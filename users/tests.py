@@ -1,3 +1,56 @@
+import os
+import tempfile
+from urllib.parse import quote
+
 from django.test import TestCase
 
-# Create your tests here.
+
+class MediaServingTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = self.settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        os.makedirs(os.path.join(media.name, 'variants', 'ab'))
+        with open(os.path.join(media.name, 'variants', 'ab', 'sm.webp'), 'wb') as fh:
+            fh.write(b'0123456789')
+        with open(os.path.join(media.name, 'avatar.png'), 'wb') as fh:
+            fh.write(b'png-bytes')
+        with open(os.path.join(media.name, 'фото_é.jpg'), 'wb') as fh:
+            fh.write(b'jpg-bytes')
+        self.media_root = media.name
+
+    def test_offloaded_response_carries_no_body(self):
+        with self.settings(MEDIA_SERVE_MODE='x-accel'):
+            response = self.client.get('/profile_pics/variants/ab/sm.webp')
+
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/variants/ab/sm.webp')
+        self.assertEqual(response.content, b'')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_offload_headers_percent_encode_non_ascii_names(self):
+        with self.settings(MEDIA_SERVE_MODE='x-accel'):
+            response = self.client.get('/profile_pics/фото_é.jpg')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/%D1%84%D0%BE%D1%82%D0%BE_%C3%A9.jpg')
+
+        with self.settings(MEDIA_SERVE_MODE='x-sendfile'):
+            response = self.client.get('/profile_pics/фото_é.jpg')
+        self.assertEqual(response['X-Sendfile'], quote(os.path.join(self.media_root, 'фото_é.jpg')))
+
+    def test_etag_revalidation_and_ranges(self):
+        response = self.client.get('/profile_pics/avatar.png')
+        self.assertEqual(b''.join(response.streaming_content), b'png-bytes')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+
+        revalidated = self.client.get('/profile_pics/avatar.png', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+        partial = self.client.get('/profile_pics/variants/ab/sm.webp', HTTP_RANGE='bytes=2-5')
+        self.assertEqual((partial.status_code, partial.content), (206, b'2345'))
+        self.assertEqual(partial['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(self.client.get('/profile_pics/avatar.png', HTTP_RANGE='bytes=50-').status_code, 416)
+
+    def test_paths_outside_media_root_are_not_served(self):
+        self.assertEqual(self.client.get('/profile_pics/../manage.py').status_code, 404)